@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import Design, Designer, Manufacturer
+
+admin.site.register(Designer)
+admin.site.register(Manufacturer)
+admin.site.register(Design)
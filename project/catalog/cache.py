@@ -0,0 +1,20 @@
+import secrets
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    """Return the current version of the catalog, changed on every write"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, secrets.token_hex(8), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Give the catalog a new version, invalidating cached list pages"""
+    cache.set(VERSION_KEY, secrets.token_hex(8), timeout=None)
@@ -0,0 +1,57 @@
+# Generated by Django 4.0.3 on 2026-10-17 03:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Designer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('nationality', models.CharField(blank=True, max_length=100)),
+                ('born', models.PositiveSmallIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Manufacturer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('country', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Design',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('designer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='designs', to='catalog.designer')),
+                ('manufacturer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='designs', to='catalog.manufacturer')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='design',
+            index=models.Index(fields=['designer', '-id'], include=('name', 'year', 'manufacturer'), name='catalog_design_designer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='design',
+            index=models.Index(fields=['manufacturer', '-id'], include=('name', 'year', 'designer'), name='catalog_design_manuf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='design',
+            index=models.Index(fields=['year', '-id'], include=('name', 'designer', 'manufacturer'), name='catalog_design_year_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import models
+
+
+class Designer(models.Model):
+    """
+    Person or studio behind a design.
+    """
+
+    name = models.CharField(max_length=255)
+    nationality = models.CharField(max_length=100, blank=True)
+    born = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Manufacturer(models.Model):
+    """
+    Company producing a design.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    country = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Design(models.Model):
+    """
+    Iconic product design of the catalog.
+
+    The filtered list pages walk the designs by descending id within a
+    designer, manufacturer or year, so each filter has an index ending in
+    id that also includes the columns of the default list fields, letting
+    PostgreSQL 11 or later answer a page with an index-only scan. Older
+    servers build the indexes without the included columns.
+    """
+
+    name = models.CharField(max_length=255)
+    year = models.PositiveSmallIntegerField(null=True, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    description = models.TextField(blank=True)
+    designer = models.ForeignKey(
+        Designer, related_name='designs', on_delete=models.PROTECT
+    )
+    manufacturer = models.ForeignKey(
+        Manufacturer, related_name='designs', null=True, blank=True,
+        on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['designer', '-id'],
+                include=['name', 'year', 'manufacturer'],
+                name='catalog_design_designer_idx',
+            ),
+            models.Index(
+                fields=['manufacturer', '-id'],
+                include=['name', 'year', 'designer'],
+                name='catalog_design_manuf_idx',
+            ),
+            models.Index(
+                fields=['year', '-id'],
+                include=['name', 'designer', 'manufacturer'],
+                name='catalog_design_year_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
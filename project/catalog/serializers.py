@@ -0,0 +1,71 @@
+from rest_framework import serializers
+
+from .models import Design, Designer, Manufacturer
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin keeping only the fields listed in the 'fields' entry of
+    the serializer context, when there is one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class DesignerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the Designer object.
+    """
+
+    class Meta:
+        model = Designer
+        fields = ['id', 'name', 'nationality', 'born']
+
+
+class ManufacturerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the Manufacturer object.
+    """
+
+    class Meta:
+        model = Manufacturer
+        fields = ['id', 'name', 'country']
+
+
+class RelatedSummarySerializer(serializers.Serializer):
+    """
+    Summary of a designer or manufacturer nested in a design.
+    """
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
+
+class DesignSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the Design object.
+
+    Designer and manufacturer are read as nested summaries and written by
+    id through designer_id and manufacturer_id.
+    """
+    designer = RelatedSummarySerializer(read_only=True)
+    manufacturer = RelatedSummarySerializer(read_only=True)
+    designer_id = serializers.PrimaryKeyRelatedField(
+        source='designer', queryset=Designer.objects.all(), write_only=True
+    )
+    manufacturer_id = serializers.PrimaryKeyRelatedField(
+        source='manufacturer', queryset=Manufacturer.objects.all(),
+        write_only=True, required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Design
+        fields = [
+            'id', 'name', 'year', 'category', 'description', 'designer',
+            'manufacturer', 'designer_id', 'manufacturer_id', 'created',
+        ]
+        read_only_fields = ['created']
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Design, Designer, Manufacturer
+
+
+@receiver(post_save, sender=Design)
+@receiver(post_save, sender=Designer)
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_delete, sender=Design)
+@receiver(post_delete, sender=Designer)
+@receiver(post_delete, sender=Manufacturer)
+def catalog_changed(sender, **kwargs):
+    """Invalidate the cached list pages when the catalog changes"""
+    bump_catalog_version()
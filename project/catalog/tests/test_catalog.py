@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework import status
+
+from catalog.models import Design, Designer, Manufacturer
+
+
+DESIGNS_URL = reverse('catalog:design-list')
+
+
+class PublicCatalogTest(APITestCase):
+    """
+    Test reading the catalog without authentication.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.designer = Designer.objects.create(name='Dieter Rams')
+        self.manufacturer = Manufacturer.objects.create(name='Braun')
+        for i in range(5):
+            Design.objects.create(
+                name=f'Design {i}', year=1960 + i, designer=self.designer,
+                manufacturer=self.manufacturer, description='Long text',
+            )
+
+    def test_list_single_query(self):
+        """Test that a page with related data is a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(DESIGNS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0], {
+            'id': Design.objects.order_by('-id')[0].id,
+            'name': 'Design 4',
+            'year': 1964,
+            'designer': {'id': self.designer.id, 'name': 'Dieter Rams'},
+            'manufacturer': {'id': self.manufacturer.id, 'name': 'Braun'},
+        })
+
+    def test_keyset_pages(self):
+        """Test that following the cursors walks every design once"""
+        names = []
+        url = f'{DESIGNS_URL}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            names += [design['name'] for design in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(names, [f'Design {i}' for i in range(4, -1, -1)])
+
+    def test_sparse_fields(self):
+        """Test that only the requested fields are returned"""
+        response = self.client.get(DESIGNS_URL, {'fields': 'id,name'})
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+        response = self.client.get(DESIGNS_URL, {'fields': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters(self):
+        """Test that filters select designs and reject invalid values"""
+        response = self.client.get(DESIGNS_URL, {'year': 1962})
+
+        self.assertEqual([design['name'] for design in
+                          response.data['results']], ['Design 2'])
+        for params in ({'year': 'abc'}, {'designer': ''},
+                       {'manufacturer': '1.5'}):
+            response = self.client.get(DESIGNS_URL, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_anonymous_list_cached_until_write(self):
+        """Test that list pages are cached and invalidated by writes"""
+        self.client.get(DESIGNS_URL)
+        with self.assertNumQueries(0):
+            self.client.get(DESIGNS_URL)
+
+        Design.objects.create(name='Design 5', designer=self.designer)
+        response = self.client.get(DESIGNS_URL)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_write_requires_authentication(self):
+        """Test that anonymous clients cannot add designs"""
+        response = self.client.post(DESIGNS_URL, {
+            'name': 'SK 4', 'designer_id': self.designer.id,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateCatalogTest(APITestCase):
+    """
+    Test editing the catalog with a JWT.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com', password='testpass876'
+        )
+        access = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.designer = Designer.objects.create(name='Dieter Rams')
+
+    def test_create_requires_permission(self):
+        """Test that users without add_design cannot add designs"""
+        response = self.client.post(DESIGNS_URL, {
+            'name': 'SK 4', 'designer_id': self.designer.id,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(DESIGNS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_design(self):
+        """Test that users with add_design can add designs"""
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='add_design')
+        )
+        response = self.client.post(DESIGNS_URL, {
+            'name': 'SK 4', 'year': 1956, 'designer_id': self.designer.id,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['designer'],
+                         {'id': self.designer.id, 'name': 'Dieter Rams'})
+        self.assertTrue(Design.objects.filter(name='SK 4').exists())
@@ -0,0 +1,15 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import DesignViewSet, DesignerViewSet, ManufacturerViewSet
+
+app_name = 'catalog'
+
+router = DefaultRouter()
+router.register('designs', DesignViewSet)
+router.register('designers', DesignerViewSet)
+router.register('manufacturers', ManufacturerViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,172 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .cache import get_catalog_version
+from .models import Design, Designer, Manufacturer
+from .serializers import DesignSerializer, DesignerSerializer, \
+    ManufacturerSerializer
+
+
+class CatalogPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, newest first.
+
+    Every page is a range scan starting after the last id of the previous
+    page, so deep pages cost the same as the first one.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class CatalogViewSet(viewsets.ModelViewSet):
+    """
+    Base viewset of the catalog.
+
+    Clients pick the fields they need with ?fields=a,b and only the matching
+    columns are selected, joining the related tables only when one of their
+    fields is requested. List pages served to anonymous clients are cached
+    until the next write to the catalog.
+
+    Anyone can read the catalog, writing takes the add, change or delete
+    permission of the model.
+    """
+    permission_classes = [permissions.DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = CatalogPagination
+
+    # Columns to select for every serializer field
+    field_columns = {}
+    # Fields of list pages when the client does not ask for any
+    list_fields = None
+    # Query parameters accepted as filters and their lookups
+    filters = {}
+
+    def get_fields(self):
+        """Return the serializer fields requested for this response"""
+        requested = self.request.query_params.get('fields')
+        if requested:
+            fields = [name for name in requested.split(',') if name]
+            unknown = set(fields) - set(self.field_columns)
+            if unknown:
+                raise ValidationError({'fields': [
+                    f"Unknown fields: {', '.join(sorted(unknown))}"
+                ]})
+            return fields
+        if self.action == 'list':
+            return self.list_fields
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method in permissions.SAFE_METHODS:
+            context['fields'] = self.get_fields()
+        return context
+
+    def clean_filter(self, param, lookup):
+        """Return the value of a filter as its column holds it"""
+        field = self.queryset.model._meta.get_field(lookup)
+        field = getattr(field, 'target_field', field)
+        try:
+            value = field.to_python(self.request.query_params[param])
+            field.run_validators(value)
+        except DjangoValidationError as error:
+            raise ValidationError({param: error.messages})
+        return value
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+
+        for param, lookup in self.filters.items():
+            if param in self.request.query_params:
+                queryset = queryset.filter(
+                    **{lookup: self.clean_filter(param, lookup)}
+                )
+
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+
+        fields = self.get_fields() or list(self.field_columns)
+        columns = {'id'}
+        for name in fields:
+            columns.update(self.field_columns[name])
+        related = {column.split('__')[0] for column in columns
+                   if '__' in column}
+        return queryset.select_related(*sorted(related)).only(*columns)
+
+    def list(self, request, *args, **kwargs):
+        """List a page, from the cache for anonymous clients"""
+        if request.user and request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        url = request.build_absolute_uri().encode()
+        key = 'catalog:list:{}:{}'.format(
+            get_catalog_version(), hashlib.sha256(url).hexdigest()
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data,
+                  timeout=getattr(settings, 'CATALOG_LIST_CACHE_TIMEOUT', 60))
+        return response
+
+
+class DesignViewSet(CatalogViewSet):
+    """
+    List, retrieve and edit the designs of the catalog.
+    """
+    queryset = Design.objects.all()
+    serializer_class = DesignSerializer
+    field_columns = {
+        'id': ['id'],
+        'name': ['name'],
+        'year': ['year'],
+        'category': ['category'],
+        'description': ['description'],
+        'designer': ['designer', 'designer__id', 'designer__name'],
+        'manufacturer': ['manufacturer', 'manufacturer__id',
+                         'manufacturer__name'],
+        'created': ['created'],
+    }
+    list_fields = ['id', 'name', 'year', 'designer', 'manufacturer']
+    filters = {
+        'designer': 'designer_id',
+        'manufacturer': 'manufacturer_id',
+        'year': 'year',
+    }
+
+
+class DesignerViewSet(CatalogViewSet):
+    """
+    List, retrieve and edit the designers of the catalog.
+    """
+    queryset = Designer.objects.all()
+    serializer_class = DesignerSerializer
+    field_columns = {
+        'id': ['id'],
+        'name': ['name'],
+        'nationality': ['nationality'],
+        'born': ['born'],
+    }
+
+
+class ManufacturerViewSet(CatalogViewSet):
+    """
+    List, retrieve and edit the manufacturers of the catalog.
+    """
+    queryset = Manufacturer.objects.all()
+    serializer_class = ManufacturerSerializer
+    field_columns = {
+        'id': ['id'],
+        'name': ['name'],
+        'country': ['country'],
+    }
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection became available within the pool timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of DB-API connections.
+
+    Holds between min_size and max_size connections. A checkout waits up to
+    timeout seconds for a free connection and optionally pings it first,
+    replacing it when the ping fails. Only connections idle for ping_after
+    seconds or more are pinged, one opened or returned moments ago is
+    trusted as is. Connections are closed instead of
+    being returned once they served max_uses checkouts or are older than
+    max_lifetime seconds.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_uses=None,
+                 max_lifetime=None, timeout=5.0, ping=None, ping_after=1.0):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping = ping
+        self.ping_after = ping_after
+
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._filled = False
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.failed_pings = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _fill(self):
+        """Open the min_size connections on first use"""
+        while self._size < self.min_size:
+            self._size += 1
+            try:
+                now = time.monotonic()
+                self._idle.append((self.connect(), 0, now, now))
+            except Exception:
+                self._size -= 1
+                raise
+        self._filled = True
+
+    def getconn(self):
+        """Check a connection out of the pool"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._cond:
+                if not self._filled:
+                    self._fill()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._size >= self.max_size:
+                            self.timeouts += 1
+                            raise PoolTimeout(
+                                f'No connection available within '
+                                f'{self.timeout} seconds.'
+                            )
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    entry = None
+
+            if entry is None:
+                try:
+                    now = time.monotonic()
+                    entry = (self.connect(), 0, now, now)
+                except Exception:
+                    self._discard()
+                    raise
+            elif self.ping is not None \
+                    and time.monotonic() - entry[3] >= self.ping_after \
+                    and not self._ping(entry[0]):
+                self._close(entry[0])
+                self._discard()
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._in_use[id(entry[0])] = entry
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            return entry[0]
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, closing it when it is worn out"""
+        with self._cond:
+            connection, uses, created, _ = self._in_use.pop(id(conn))
+            uses += 1
+            expired = (
+                self.max_uses is not None and uses >= self.max_uses
+                or self.max_lifetime is not None
+                and time.monotonic() - created >= self.max_lifetime
+            )
+            if not discard and not expired:
+                self._idle.append((connection, uses, created,
+                                   time.monotonic()))
+                self._cond.notify()
+                return
+            if expired:
+                self.recycled += 1
+
+        self._close(conn)
+        self._discard()
+
+    def closeall(self):
+        """Close every idle connection and forget the in use ones"""
+        with self._cond:
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._filled = False
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Return the size, utilization and wait time of the pool"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_size': self.max_size,
+                'utilization': len(self._in_use) / self.max_size,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled,
+                'failed_pings': self.failed_pings,
+                'wait_seconds_total': self.wait_total,
+                'wait_seconds_max': self.wait_max,
+            }
+
+    def _discard(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _ping(self, conn):
+        try:
+            self.ping(conn)
+        except Exception:
+            with self._cond:
+                self.failed_pings += 1
+            return False
+        return True
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,148 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool.
+
+Configure it with ENGINE 'designh.db.postgresql_pool' and an optional POOL
+dictionary in the database settings:
+
+    'POOL': {
+        'MIN_SIZE': 1,          # connections opened on first use
+        'MAX_SIZE': 10,         # hard limit per process
+        'MAX_USES': 1000,       # checkouts before a connection is recycled
+        'MAX_LIFETIME': 3600,   # seconds before a connection is recycled
+        'TIMEOUT': 5,           # seconds to wait for a free connection
+        'PRE_PING': True,       # run SELECT 1 on checkout
+        'PING_AFTER': 1,        # seconds idle before a checkout pings
+    }
+
+Keep CONN_MAX_AGE at 0: Django then "closes" the connection at the end of
+every request, which hands it back to the pool.
+"""
+import functools
+import os
+import threading
+
+import psycopg2
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions, extras
+
+from designh import metrics
+from designh.db.pool import ConnectionPool
+
+
+DEFAULT_POOL = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'MAX_USES': 1000,
+    'MAX_LIFETIME': 3600,
+    'TIMEOUT': 5,
+    'PRE_PING': True,
+    'PING_AFTER': 1,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connect(conn_params):
+    """Open a connection for a pool, like the PostgreSQL backend does"""
+    connection = psycopg2.connect(**conn_params)
+    # The backend decodes JSON itself, skip psycopg2's decoding
+    extras.register_default_jsonb(conn_or_curs=connection,
+                                  loads=lambda value: value)
+    return connection
+
+
+def ping(connection):
+    """Check a pooled connection still answers"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    # Outside autocommit the query opened a transaction, which would leave
+    # the session idle in transaction and break set_session on checkout
+    if not connection.autocommit:
+        connection.rollback()
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process"""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items()
+                 if key[1] == os.getpid()]
+    for pool in pools:
+        pool.closeall()
+
+
+def pool_metrics():
+    """Return the stats of every pool of this process as metrics"""
+    values = {}
+    with _pools_lock:
+        pools = [(key[0], pool) for key, pool in _pools.items()
+                 if key[1] == os.getpid()]
+    for alias, pool in pools:
+        for name, value in pool.stats().items():
+            values[f'db_pool_{name}{{alias="{alias}"}}'] = value
+    return values
+
+
+metrics.register_collector(pool_metrics)
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def destroy_test_db(self, *args, **kwargs):
+        # The test database cannot be dropped while idle pooled
+        # connections are still attached to it.
+        self.connection.close()
+        self.connection.get_pool().closeall()
+        return super().destroy_test_db(*args, **kwargs)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self):
+        """Return the pool for this alias and connection parameters"""
+        conn_params = self.get_connection_params()
+        key = (self.alias, os.getpid(), repr(sorted(conn_params.items())))
+
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = {**DEFAULT_POOL, **self.settings_dict.get('POOL',
+                                                                    {})}
+                pool = _pools[key] = ConnectionPool(
+                    connect=functools.partial(connect, conn_params),
+                    min_size=options['MIN_SIZE'],
+                    max_size=options['MAX_SIZE'],
+                    max_uses=options['MAX_USES'],
+                    max_lifetime=options['MAX_LIFETIME'],
+                    timeout=options['TIMEOUT'],
+                    ping=ping if options['PRE_PING'] else None,
+                    ping_after=options['PING_AFTER'],
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool().getconn()
+        # Any thread of the process may have opened the connection and
+        # isolation_level is not part of the pool key, set it on checkout
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get('isolation_level',
+                                           connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        """Hand the connection back to the pool instead of closing it"""
+        if self.connection is None:
+            return
+
+        connection = self.connection
+        discard = bool(connection.closed)
+        if not discard and connection.get_transaction_status() \
+                != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        self.get_pool().putconn(connection, discard=discard)
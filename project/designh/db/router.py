@@ -0,0 +1,198 @@
+"""
+Read replica routing.
+
+ReplicaRouter sends reads to the healthy aliases of REPLICATION['REPLICAS']
+and everything else to the default database. ReplicaMiddleware keeps the
+reads of a client on the primary for STICKY_SECONDS after one of its
+requests wrote, see designh/middleware.py, so a client always reads its
+own writes. Reads that fill a cache right after an invalidation go to
+the primary explicitly with .using(DEFAULT_DB_ALIAS):
+
+    DATABASE_ROUTERS = ['designh.db.router.ReplicaRouter']
+    REPLICATION = {
+        'REPLICAS': ['replica'],
+        'STICKY_SECONDS': 10,   # primary reads after a client wrote
+        'CHECK_INTERVAL': 5,    # seconds between health checks of a replica
+        'MAX_LAG': 5.0,         # seconds of replay lag a replica may have
+    }
+
+A replica is another entry of DATABASES. Give it 'TEST': {'MIRROR':
+'default'} so test runs read from the test database, and a short
+OPTIONS['connect_timeout'] so a probe of an unreachable replica gives up.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from designh import metrics
+
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 10,
+    'CHECK_INTERVAL': 5,
+    'MAX_LAG': 5.0,
+}
+
+# Seconds a standby is behind, 0 when it replayed all it received
+LAG_QUERY = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+    'END'
+)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_option(key):
+    """Return an option of the REPLICATION setting"""
+    return getattr(settings, 'REPLICATION', {}).get(key, DEFAULTS[key])
+
+
+def probe(alias):
+    """Return the replication lag of a replica in seconds, or None"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != 'postgresql':
+                cursor.execute('SELECT 1')
+                return None
+            cursor.execute(LAG_QUERY)
+            lag = cursor.fetchone()[0]
+    finally:
+        # The connection belongs to the probing thread, which ends here
+        connection.close()
+    return None if lag is None else float(lag)
+
+
+class ReplicaHealth:
+    """
+    Health of the replicas as seen by this process.
+
+    A replica is probed at most once every check_interval seconds and is
+    healthy while the probe succeeds and its replication lag stays within
+    max_lag seconds. Probes run in a background thread, requests keep the
+    last result meanwhile and a replica takes no reads before its first
+    probe succeeds, so a replica that hangs never holds up a request.
+    """
+
+    def __init__(self, check_interval, max_lag, probe=probe):
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.probe = probe
+        self._checks = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        """Return whether reads can be sent to a replica"""
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checks.get(alias)
+            if checked is not None and now - checked[0] < self.check_interval:
+                return checked[1]
+            healthy, lag = checked[1:] if checked else (False, None)
+            self._checks[alias] = (now, healthy, lag)
+
+        threading.Thread(
+            target=self.check, args=(alias, now),
+            name=f'replica-probe-{alias}', daemon=True,
+        ).start()
+        return healthy
+
+    def check(self, alias, now):
+        """Probe a replica and record its health"""
+        try:
+            lag = self.probe(alias)
+            healthy = lag is None or lag <= self.max_lag
+        except Exception:
+            logger.warning('Replica %s failed its health check', alias,
+                           exc_info=True)
+            healthy, lag = False, None
+
+        with self._lock:
+            self._checks[alias] = (now, healthy, lag)
+
+    def stats(self):
+        """Return the health and lag of every checked replica"""
+        with self._lock:
+            return {alias: (healthy, lag)
+                    for alias, (_, healthy, lag) in self._checks.items()}
+
+
+def get_health():
+    """Return the process wide replica health"""
+    global _health
+
+    with _health_lock:
+        if _health is None:
+            _health = ReplicaHealth(
+                check_interval=get_option('CHECK_INTERVAL'),
+                max_lag=get_option('MAX_LAG'),
+            )
+        return _health
+
+
+def replica_metrics():
+    """Return the health and lag of the replicas as metrics"""
+    values = {}
+    for alias, (healthy, lag) in get_health().stats().items():
+        values[f'db_replica_healthy{{alias="{alias}"}}'] = int(healthy)
+        if lag is not None:
+            values[f'db_replica_lag_seconds{{alias="{alias}"}}'] = lag
+    return values
+
+
+metrics.register_collector(replica_metrics)
+
+
+def pin_to_primary(pinned=True):
+    """Send the reads of the current thread to the primary, or stop"""
+    _local.pinned = pinned
+    _local.wrote = False
+
+
+def wrote():
+    """Return whether the current thread wrote since it was last pinned"""
+    return getattr(_local, 'wrote', False)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random healthy replica and writes to the primary.
+
+    Reads stay on the primary when no replica is healthy, inside a
+    transaction on the primary, after the current request wrote, and while
+    ReplicaMiddleware pinned the client to the primary.
+    """
+    health = None
+
+    def db_for_read(self, model, **hints):
+        replicas = get_option('REPLICAS')
+        if not replicas or getattr(_local, 'pinned', False) or wrote() \
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        health = self.health or get_health()
+        healthy = [alias for alias in replicas if health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_option('REPLICAS'):
+            return False
+        return None
@@ -0,0 +1,180 @@
+"""
+Request metrics shared by the server processes.
+
+Code that spends time in a phase worth reporting (SQL, hashing, token
+verification, rendering) records it with record(); PerformanceMiddleware
+collects the phases of each request, emits them as a Server-Timing header
+and aggregates them into per-view histograms served by MetricsView.
+
+The histograms live in a shared memory map created when this module is
+imported, so the workers forked from a preloaded gunicorn master all add to
+the same histograms and whichever worker answers /metrics reports the whole
+server. A server started without preloading, or several servers, must each
+be scraped.
+
+Other modules can publish counters and gauges by registering a collector,
+a callable returning a dictionary of metric names to values. Collectors
+reading process state, like the connection pools, describe the worker that
+answered the scrape.
+"""
+import bisect
+import struct
+import threading
+import zlib
+
+from user.shared_memory import LockTimeout, SharedMap
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Distinct (view, phase) pairs the shared map has room for
+MAX_SERIES = 1024
+# Bytes of a series key, longer keys are cut
+KEY_SIZE = 96
+# Observations dropped because every series slot was taken
+HEADER = struct.Struct('=Q')
+# View and phase separated by a NUL, bucket counts, sum and count, an empty
+# key marks a free slot
+SERIES = struct.Struct(f'={KEY_SIZE}s{len(BUCKETS) + 1}QdQ')
+# Requests skip their observation rather than wait longer for the lock
+LOCK_TIMEOUT = 0.05
+
+_local = threading.local()
+_collectors = []
+
+
+def record(phase, seconds):
+    """Add time spent in a phase to the current request"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        timings = _local.timings = {}
+    timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+def pop_timings():
+    """Return and reset the phase timings of the current request"""
+    timings = getattr(_local, 'timings', None) or {}
+    _local.timings = {}
+    return timings
+
+
+class Histograms:
+    """
+    Cumulative histograms with fixed buckets, in the Prometheus sense, kept
+    in a shared memory map.
+
+    Like the throttling buckets, the map and its lock are inherited by the
+    processes forked after creation, see user/shared_memory.py. Series are
+    found by open addressing on their key. Once max_series are in use,
+    observations of new series are dropped and counted.
+    """
+
+    def __init__(self, max_series=MAX_SERIES):
+        self.max_series = max_series
+        self._shared = SharedMap(HEADER.size + max_series * SERIES.size)
+        self._map = self._shared.map
+
+    def _slot(self, key):
+        """Return the offset of the series of key, None when full"""
+        slot = zlib.crc32(key) % self.max_series
+        for _ in range(self.max_series):
+            offset = HEADER.size + slot * SERIES.size
+            found = SERIES.unpack_from(self._map, offset)[0].rstrip(b'\0')
+            if not found:
+                SERIES.pack_into(self._map, offset, key,
+                                 *[0] * (len(BUCKETS) + 1), 0.0, 0)
+                return offset
+            if found == key:
+                return offset
+            slot = (slot + 1) % self.max_series
+        return None
+
+    def observe(self, view, timings):
+        """Add the phase timings of one request to the histograms of a view"""
+        try:
+            with self._shared.lock(LOCK_TIMEOUT):
+                for phase, seconds in timings.items():
+                    key = f'{view}\0{phase}'.encode()[:KEY_SIZE]
+                    offset = self._slot(key)
+                    if offset is None:
+                        dropped, = HEADER.unpack_from(self._map, 0)
+                        HEADER.pack_into(self._map, 0, dropped + 1)
+                        continue
+                    _, *counts, total, count = SERIES.unpack_from(
+                        self._map, offset
+                    )
+                    counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+                    SERIES.pack_into(self._map, offset, key, *counts,
+                                     total + seconds, count + 1)
+        except LockTimeout:
+            pass
+
+    def snapshot(self):
+        """
+        Return the number of dropped observations and a sorted list of
+        ((view, phase), counts, sum, count)
+        """
+        with self._shared.lock(LOCK_TIMEOUT):
+            data = bytes(self._map)
+
+        histograms = []
+        for offset in range(HEADER.size, len(data), SERIES.size):
+            key, *counts, total, count = SERIES.unpack_from(data, offset)
+            key = key.rstrip(b'\0')
+            if key:
+                view, _, phase = key.decode(errors='replace').partition('\0')
+                histograms.append(((view, phase), counts, total, count))
+        return HEADER.unpack_from(data, 0)[0], sorted(histograms)
+
+    def reset(self):
+        """Drop every histogram"""
+        with self._shared.lock(LOCK_TIMEOUT):
+            self._map[:] = bytes(len(self._map))
+
+
+# Created on import so a preloaded master holds it before the workers fork
+_histograms = Histograms()
+
+
+def observe(view, timings):
+    """Add the phase timings of one request to the histograms of a view"""
+    _histograms.observe(view, timings)
+
+
+def register_collector(collector):
+    """Register a callable returning extra metrics to expose"""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def reset():
+    """Drop every histogram"""
+    _histograms.reset()
+
+
+def render_prometheus():
+    """Return every metric in the Prometheus text exposition format"""
+    name = 'designh_request_phase_seconds'
+    lines = [f'# TYPE {name} histogram']
+
+    # A scrape failing on LockTimeout beats one reporting empty histograms
+    dropped, histograms = _histograms.snapshot()
+
+    for (view, phase), counts, total, count in histograms:
+        labels = f'view="{view}",phase="{phase}"'
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} '
+                         f'{cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {total}')
+        lines.append(f'{name}_count{{{labels}}} {count}')
+    lines.append(f'designh_request_phase_dropped {dropped}')
+
+    for collector in _collectors:
+        for metric, value in sorted(collector().items()):
+            lines.append(f'designh_{metric} {value}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,215 @@
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.core.cache import cache
+from django.db import connections
+from django.middleware import csrf
+
+from . import metrics
+from .db import router
+from .profiling import get_option, get_ring
+
+
+STICKY_KEY = 'db:primary:{}'
+STICKY_COOKIE = 'db_primary'
+
+
+class PerformanceMiddleware:
+    """
+    Break every request down into the time spent in SQL, password hashing,
+    authentication and rendering.
+
+    The breakdown is sent back in a Server-Timing header and aggregated into
+    per-view histograms exposed by the metrics endpoint. Keep it first in
+    MIDDLEWARE so the total covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.pop_timings()
+        queries = [0, 0.0]
+
+        def time_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        timings = metrics.pop_timings()
+        timings['db'] = queries[1]
+        timings['total'] = total
+
+        response['Server-Timing'] = ', '.join(
+            f'{phase};dur={seconds * 1000:.2f}'
+            + (f';desc="{queries[0]} queries"' if phase == 'db' else '')
+            for phase, seconds in timings.items()
+        )
+
+        match = request.resolver_match
+        metrics.observe(match.view_name if match else 'unresolved', timings)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering of template and DRF responses"""
+        start = time.perf_counter()
+
+        def rendered(response):
+            metrics.record('render', time.perf_counter() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile the handling of selected requests with cProfile.
+
+    A request is profiled when its X-Profile header matches
+    PROFILING['TOKEN'], or at random for a PROFILING['SAMPLE_RATE'] share
+    of the traffic. The profile is stored in the profile ring and its file
+    name returned in an X-Profile header. Place it right after
+    PerformanceMiddleware so the profile covers the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        """Return whether to profile a request"""
+        token = get_option('TOKEN')
+        header = request.META.get('HTTP_X_PROFILE')
+        # WSGI headers are latin-1 strings, compare_digest only takes ASCII
+        if token and header and hmac.compare_digest(
+                header.encode('latin-1'), token.encode()):
+            return True
+        rate = get_option('SAMPLE_RATE')
+        return bool(rate) and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running in this thread
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        profile = get_ring().save(
+            profiler, match.view_name if match else 'unresolved', duration
+        )
+        response['X-Profile'] = os.path.basename(profile.path)
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Keep the reads of a client on the primary for a while after it wrote.
+
+    A client is known by its Authorization header, pinned in the cache
+    shared by every worker, and by a STICKY_COOKIE set on the response to
+    its write. The cookie covers a client that registers and then logs in
+    with a new token, without pinning everyone else behind the same proxy
+    or NAT. It holds the time the pin ends.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def client_keys(self, request):
+        """Return the cache keys pinning a client to the primary"""
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return []
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return [STICKY_KEY.format(digest[:32])]
+
+    def is_pinned(self, request, keys):
+        """Return whether a client wrote less than STICKY_SECONDS ago"""
+        try:
+            until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            until = 0
+        return until > time.time() or bool(keys and cache.get_many(keys))
+
+    def __call__(self, request):
+        if not router.get_option('REPLICAS'):
+            return self.get_response(request)
+
+        keys = self.client_keys(request)
+        router.pin_to_primary(self.is_pinned(request, keys))
+        try:
+            response = self.get_response(request)
+            if router.wrote():
+                seconds = router.get_option('STICKY_SECONDS')
+                if keys:
+                    cache.set_many(dict.fromkeys(keys, True), seconds)
+                response.set_cookie(
+                    STICKY_COOKIE, f'{time.time() + seconds:.3f}',
+                    max_age=seconds, httponly=True, samesite='Lax',
+                )
+        finally:
+            router.pin_to_primary(False)
+        return response
+
+
+class SkipAPIMixin:
+    """
+    Pass requests under settings.API_PATH_PREFIX straight through.
+
+    The API authenticates every request with a JWT in DRF and its views are
+    CSRF exempt, so the session, CSRF, authentication and messages
+    middleware only serve the admin. Mixed into them, API requests skip
+    their hooks and the lazy session lookup they would set up.
+    """
+
+    def __call__(self, request):
+        if request.path_info.startswith(settings.API_PATH_PREFIX):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipAPIMixin, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkipAPIMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(SkipAPIMixin,
+                               auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipAPIMixin, messages_middleware.MessageMiddleware):
+    pass
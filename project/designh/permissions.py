@@ -0,0 +1,11 @@
+from django.conf import settings
+from rest_framework import permissions
+
+
+class IsInternalRequest(permissions.BasePermission):
+    """
+    Allow requests coming from one of the INTERNAL_IPS.
+    """
+
+    def has_permission(self, request, view):
+        return request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
@@ -0,0 +1,98 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware runs cProfile over the handling of a request when the
+request carries the PROFILING['TOKEN'] in an X-Profile header, or for a
+random PROFILING['SAMPLE_RATE'] share of the traffic. Each profile is
+written as a pstats file to PROFILING['DIRECTORY'], which keeps the latest
+MAX_PROFILES of them, and `manage.py profiles` lists and aggregates them.
+"""
+import os
+import re
+import tempfile
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+
+DEFAULTS = {
+    'TOKEN': None,
+    'SAMPLE_RATE': 0.0,
+    'DIRECTORY': os.path.join(tempfile.gettempdir(), 'designh-profiles'),
+    'MAX_PROFILES': 100,
+}
+
+SUFFIX = '.prof'
+
+
+def get_option(key):
+    """Return an option of the PROFILING setting"""
+    return getattr(settings, 'PROFILING', {}).get(key, DEFAULTS[key])
+
+
+# A stored profile and the request it was taken from
+Profile = namedtuple('Profile', 'path created pid duration view')
+
+
+class ProfileRing:
+    """
+    Directory holding the latest max_profiles profiles.
+
+    Files are named after the time, process, duration and view of the
+    request, so listing the ring needs no index shared between processes.
+    Every write evicts the oldest files past max_profiles.
+    """
+
+    def __init__(self, directory, max_profiles):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, profiler, view, duration):
+        """Write the stats of a profiler and return the stored Profile"""
+        os.makedirs(self.directory, exist_ok=True)
+        view = re.sub(r'[^\w.]+', '.', view)
+        name = (f'{time.time_ns() // 1000}-{os.getpid()}-'
+                f'{round(duration * 1e6)}-{view}{SUFFIX}')
+        path = os.path.join(self.directory, name)
+        tmp_path = f'{path}.tmp'
+        profiler.dump_stats(tmp_path)
+        os.replace(tmp_path, path)
+
+        for profile in self.profiles()[:-self.max_profiles]:
+            try:
+                os.remove(profile.path)
+            except FileNotFoundError:
+                # Evicted by another process
+                pass
+        return self._parse(name)
+
+    def _parse(self, name):
+        created, pid, duration, view = name[:-len(SUFFIX)].split('-', 3)
+        return Profile(
+            path=os.path.join(self.directory, name),
+            created=int(created) / 1e6,
+            pid=int(pid),
+            duration=int(duration) / 1e6,
+            view=view,
+        )
+
+    def profiles(self):
+        """Return the stored profiles, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            if name.endswith(SUFFIX):
+                try:
+                    profiles.append(self._parse(name))
+                except ValueError:
+                    continue
+        return sorted(profiles, key=lambda profile: profile.created)
+
+
+def get_ring():
+    """Return the profile ring configured by the PROFILING setting"""
+    return ProfileRing(get_option('DIRECTORY'), get_option('MAX_PROFILES'))
@@ -27,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Clients allowed to read the metrics endpoint without authenticating
+INTERNAL_IPS = ['127.0.0.1']
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -41,29 +44,55 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
     'user',
+    'catalog',
 ]
 
 MIDDLEWARE = [
+    'designh.middleware.PerformanceMiddleware',
+    'designh.middleware.ProfilingMiddleware',
+    'designh.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Session, CSRF, authentication and messages skip API_PATH_PREFIX,
+    # only the admin uses them
+    'designh.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'designh.middleware.CsrfViewMiddleware',
+    'designh.middleware.AuthenticationMiddleware',
+    'designh.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_PATH_PREFIX = '/api/'
+
+# Requests sending the TOKEN in an X-Profile header, and a SAMPLE_RATE
+# share of all requests, are profiled into DIRECTORY, which keeps the latest
+# MAX_PROFILES of them, see designh/profiling.py and manage.py profiles
+PROFILING = {
+    'TOKEN': os.environ.get('PROFILING_TOKEN'),
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0)),
+    'DIRECTORY': os.environ.get('PROFILING_DIRECTORY',
+                                '/tmp/designh-profiles'),
+    'MAX_PROFILES': 100,
+}
+
 # Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'user.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'user.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are
+    # trusted, client addresses come from the peer address with 0
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=2),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': False,
     'UPDATE_LAST_LOGIN': False,
 
@@ -92,6 +121,96 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Password hashing runs on a bounded process pool, see user/hashing.py.
+# Every server process has its own pool, so WORKERS defaults to the CPUs
+# divided among the SERVER_PROCESSES, which gunicorn.conf.py exports as
+# WEB_CONCURRENCY, and the host runs about one hashing process per CPU.
+# 0 hashes inline on the request worker, MAX_PENDING defaults to four jobs
+# per worker.
+PASSWORD_HASHING = {
+    'WORKERS': None,
+    'SERVER_PROCESSES': int(os.environ.get('WEB_CONCURRENCY', 1)),
+    'MAX_PENDING': None,
+    'QUEUE_TIMEOUT': 2.0,
+    # PBKDF2 iterations, see manage.py calibrate_hashers
+    'ITERATIONS': int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0)) or None,
+    # Upgrade outdated hashes after the login response instead of before
+    'DEFER_REHASH': True,
+    'MAX_PENDING_REHASHES': 1000,
+}
+
+BULK_REGISTRATION = {
+    'BATCH_SIZE': 500,
+    'MAX_USERS': 5000,
+}
+
+# Batch resolution of user ids for internal services, see
+# user.views.UserResolveView. Results of at least STREAM_MIN_IDS ids are
+# streamed.
+USER_RESOLUTION = {
+    'MAX_IDS': 1000,
+    'STREAM_MIN_IDS': 200,
+    'CACHE_TIMEOUT': 3600,
+}
+
+# Seconds anonymous catalog list pages stay cached, writes invalidate them
+CATALOG_LIST_CACHE_TIMEOUT = 60
+
+# Per process cache of verified JWT payloads, see user/tokens.py
+TOKEN_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 300,
+}
+
+# Permission checks read a cached bitset of each user's permissions, see
+# user/backends.py. With IN_TOKEN the bits also travel in the access token
+# and are trusted until it expires, so a revoked permission can outlive its
+# revocation by up to ACCESS_TOKEN_LIFETIME.
+PERMISSIONS = {
+    'IN_TOKEN': False,
+    'TIMEOUT': 3600,
+}
+
+# Tokens carry the profile and version of their user and safe requests are
+# authenticated from them without a query while the version is current,
+# see user/stateless.py
+STATELESS_AUTH = {
+    'ENABLED': False,
+}
+
+# Login times are buffered and written in bulk, see user/last_login.py;
+# UPDATE_LAST_LOGIN stays off so issuing tokens does not write. A process
+# killed without a chance to flush loses up to FLUSH_INTERVAL seconds of
+# logins. None writes only on an explicit flush and at exit.
+LAST_LOGIN = {
+    'FLUSH_INTERVAL': 10,
+    'BATCH_SIZE': 500,
+    'MAX_PENDING': 10000,
+}
+
+# Refresh tokens revoked by rotation, shared by all the worker processes
+# forked from the same master, see user/revocation.py. The list holds RATE
+# refreshes a second for a whole refresh token lifetime, or CAPACITY
+# revocations when set, and is snapshotted to PATH so a restart keeps them.
+REVOCATION = {
+    'RATE': int(os.environ.get('REVOCATION_RATE', 10)),
+    'CAPACITY': None,
+    'PATH': os.environ.get('REVOCATION_LIST_PATH',
+                           str(BASE_DIR / 'var' / 'revocations.bin')),
+    'PERSIST_INTERVAL': 60,
+}
+
+# Token buckets in front of the hashing endpoints, shared by all the worker
+# processes forked from the same master, see user/throttling.py
+THROTTLING = {
+    'RATES': {
+        'token_ip': '30/min',
+        'token_email': '10/min',
+        'register_ip': '20/min',
+    },
+    'SLOTS': 65536,
+}
+
 ROOT_URLCONF = 'designh.urls'
 
 TEMPLATES = [
@@ -112,34 +231,95 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'designh.wsgi.application'
 
+TEST_RUNNER = 'designh.test_runner.TestRunner'
+
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Connections come from a per-process pool, see designh/db/postgresql_pool.
+# Size MAX_SIZE so that workers * MAX_SIZE stays below max_connections.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'designh.db.postgresql_pool',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'MAX_USES': 1000,
+            'MAX_LIFETIME': 3600,
+            'TIMEOUT': 5,
+            'PRE_PING': True,
+            'PING_AFTER': 1,
+        },
     }
 }
 
+# Read replicas, one per host of DB_REPLICA_HOSTS, take the reads that do
+# not need the primary, see designh/db/router.py
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'},
+        OPTIONS={'connect_timeout': 2},
+    )
+
+DATABASE_ROUTERS = ['designh.db.router.ReplicaRouter']
+
+REPLICATION = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    # Seconds the reads of a client stay on the primary after it wrote
+    'STICKY_SECONDS': 10,
+    'CHECK_INTERVAL': 5,
+    'MAX_LAG': 5.0,
+}
+
+PASSWORD_HASHERS = [
+    'user.hashers.OffloadedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# User versions are shared through the cache, so every worker must see the
+# same cache. Local memory is only suitable for a single process.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+        'OPTIONS': {
+            'user_attributes': ('email', 'name'),
+        },
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+        'NAME': 'user.password_validation.PasswordPolicyValidator',
+        'OPTIONS': {
+            'min_length': 9,
+            'password_list_path': os.environ.get('PASSWORD_LIST_PATH'),
+        },
     },
 ]
 
@@ -165,3 +345,5 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.CustomUser'
+
+AUTHENTICATION_BACKENDS = ['user.backends.PermissionBitsBackend']
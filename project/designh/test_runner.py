@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that keeps the last login recorder from writing behind the
+    tests' back.
+
+    Its background thread would flush logins in the middle of other tests
+    and, on SQLite, find the table locked. Tests flush it explicitly
+    instead, and whatever is left is written before the test databases are
+    destroyed rather than at exit, when the real database is configured
+    again.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._last_login_settings = override_settings(LAST_LOGIN={
+            **getattr(settings, 'LAST_LOGIN', {}), 'FLUSH_INTERVAL': None,
+        })
+        self._last_login_settings.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        from user.last_login import get_last_login_recorder
+
+        get_last_login_recorder().flush()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self._last_login_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -16,7 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/user/', include('user.urls'))
+    path('api/user/', include('user.urls')),
+    path('api/catalog/', include('catalog.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from . import metrics
+from .permissions import IsInternalRequest
+
+
+class MetricsView(APIView):
+    """
+    Expose the request metrics in the Prometheus text format.
+    """
+    permission_classes = [permissions.IsAdminUser | IsInternalRequest]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.render_prometheus(),
+                            content_type='text/plain; version=0.0.4')
@@ -0,0 +1,195 @@
+"""
+Warm up the application before serving requests.
+
+warm() runs the first-use initialization that would otherwise fall on the
+first request of every worker: URL resolver population, password hashers
+and validators, REST framework and simplejwt settings, serializer fields and
+templates. gunicorn.conf.py calls it in the master after preloading the app,
+so workers fork with all of it already in shared memory.
+
+Run the module to see where startup time goes:
+
+    python -m designh.warmup --top 20
+
+It boots the project in a child interpreter started with -X importtime and
+reports the slowest modules and packages followed by each warm step.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def _walk_patterns(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _walk_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def warm_urls():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # Populating the reverse dictionaries is otherwise done by the first
+    # reverse() of each worker
+    resolver.reverse_dict
+    for pattern in _walk_patterns(resolver.url_patterns):
+        pattern.pattern.regex
+
+
+def warm_auth():
+    from django.contrib.auth.hashers import get_hashers
+    from django.contrib.auth.password_validation import \
+        get_default_password_validators
+
+    get_hashers()
+    for validator in get_default_password_validators():
+        # Validators loading a password list do it on first use, load it in
+        # the master so the workers share its pages
+        getattr(validator, 'passwords', None)
+
+
+def warm_rest_framework():
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.settings import \
+        api_settings as jwt_settings
+    from rest_framework_simplejwt.state import token_backend
+
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                 'DEFAULT_PARSER_CLASSES', 'DEFAULT_THROTTLE_CLASSES'):
+        getattr(api_settings, name)
+    jwt_settings.AUTH_TOKEN_CLASSES
+    # Loads the signing algorithms of PyJWT
+    token_backend.decode(token_backend.encode({'warmup': True}))
+
+
+def warm_serializers():
+    from django.apps import apps
+    from django.urls import get_resolver
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    for pattern in _walk_patterns(get_resolver().url_patterns):
+        view = getattr(pattern.callback, 'cls', None)
+        serializer_class = getattr(view, 'serializer_class', None)
+        if serializer_class is not None:
+            serializer_class().fields
+
+
+def warm_templates():
+    from django.template import TemplateDoesNotExist
+    from django.template.loader import get_template
+
+    for name in ('rest_framework/api.html', 'admin/login.html',
+                 'admin/change_list.html'):
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('auth', warm_auth),
+    ('rest_framework', warm_rest_framework),
+    ('serializers', warm_serializers),
+    ('templates', warm_templates),
+)
+
+
+def warm():
+    """Run every warm step and return a list of (step, seconds)"""
+    timings = []
+    for name, step in STEPS:
+        start = time.perf_counter()
+        step()
+        timings.append((name, time.perf_counter() - start))
+    return timings
+
+
+def parse_importtime(lines):
+    """
+    Return (module, self_us, cumulative_us) for every line of the report
+    printed by python -X importtime.
+    """
+    modules = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            # The header line
+            continue
+        modules.append((fields[2].strip(), self_us, cumulative_us))
+    return modules
+
+
+def _boot():
+    """Set up the project, warm it and print the timings as JSON"""
+    start = time.perf_counter()
+    import django
+    django.setup()
+    from designh import wsgi  # noqa
+    setup = time.perf_counter() - start
+    json.dump({'setup': setup, 'steps': warm()}, sys.stdout)
+
+
+def report(top):
+    """Boot the project under -X importtime and print where time went"""
+    child = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'designh.warmup',
+         '--boot'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+    modules = parse_importtime(child.stderr.splitlines())
+    timings = json.loads(child.stdout)
+
+    packages = defaultdict(int)
+    for module, self_us, _ in modules:
+        packages[module.split('.')[0]] += self_us
+
+    print(f"{'module':<60}{'self ms':>10}{'cumul ms':>10}")
+    for module, self_us, cumulative_us in sorted(
+            modules, key=lambda m: m[1], reverse=True)[:top]:
+        print(f'{module:<60}{self_us / 1000:>10.1f}'
+              f'{cumulative_us / 1000:>10.1f}')
+
+    print(f"\n{'package':<60}{'self ms':>10}")
+    for package, self_us in sorted(packages.items(), key=lambda p: p[1],
+                                   reverse=True)[:top]:
+        print(f'{package:<60}{self_us / 1000:>10.1f}')
+
+    print(f"\n{'startup step':<60}{'ms':>10}")
+    print(f"{'imports and django.setup':<60}{timings['setup'] * 1000:>10.1f}")
+    for step, seconds in timings['steps']:
+        print(f'{step:<60}{seconds * 1000:>10.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1],
+                                     prog='python -m designh.warmup')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Modules and packages to list.')
+    parser.add_argument('--boot', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'designh.settings')
+    if args.boot:
+        _boot()
+    else:
+        report(args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for production.
+
+The app is imported and warmed once in the master, then the garbage
+collector is frozen so forking workers does not touch, and copy, the pages
+of those objects. Every worker starts with a loaded URL resolver, hashers,
+password list and serializers and serves its first request at full speed.
+
+Each worker hashes passwords on its own process pool of cpu_count //
+workers processes, see PASSWORD_HASHING in designh/settings.py, so the
+host runs about workers * (cpu_count // workers) hashing processes.
+
+Serves designh.wsgi with threaded workers by default. Set GUNICORN_APP to
+designh.asgi:application and GUNICORN_WORKER_CLASS to
+uvicorn.workers.UvicornWorker to serve the ASGI application instead.
+"""
+import gc
+import multiprocessing
+import os
+import time
+
+
+_started = time.perf_counter()
+
+wsgi_app = os.environ.get('GUNICORN_APP', 'designh.wsgi:application')
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Read by the settings, loaded after this file, to size the hashing pools
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def when_ready(server):
+    from django.db import connections
+
+    from designh.db.postgresql_pool.base import close_pools
+    from designh.warmup import warm
+
+    for step, seconds in warm():
+        server.log.info('Warmed %s in %.1fms', step, seconds * 1000)
+
+    # Closing a pooled connection only hands it back to the pool, close the
+    # pools too so the workers do not inherit the master's sockets
+    connections.close_all()
+    close_pools()
+    gc.collect()
+    gc.freeze()
+    server.log.info('Application ready in %.1fms',
+                    (time.perf_counter() - _started) * 1000)
+
+
+def post_fork(server, worker):
+    from user.hashing import reset_executor
+
+    # A pool started by the master belongs to the master
+    reset_executor()
+
+
+def worker_exit(server, worker):
+    from user.last_login import get_last_login_recorder
+
+    get_last_login_recorder().flush()
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from designh import metrics
+        from . import signals  # noqa: F401
+        from .last_login import last_login_metrics
+        from .rehash import rehash_metrics
+        from .revocation import get_revocations, revocation_metrics
+        from .throttling import get_buckets, throttle_metrics
+        from .tokens import token_cache_metrics
+
+        metrics.register_collector(token_cache_metrics)
+        # Created here so preforked workers inherit the same shared memory
+        get_buckets()
+        get_revocations()
+        metrics.register_collector(throttle_metrics)
+        metrics.register_collector(revocation_metrics)
+        metrics.register_collector(rehash_metrics)
+        metrics.register_collector(last_login_metrics)
@@ -0,0 +1,80 @@
+import time
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from designh import metrics
+
+from .conf import get_setting
+from .permission_bits import decode_bits
+from .stateless import StatelessUser, is_current
+from .tokens import get_verified_token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips signature verification for tokens found
+    in the verified token cache.
+
+    With STATELESS_AUTH['ENABLED'], safe requests bearing a token whose
+    version claim is current are authenticated as a StatelessUser without
+    reading the user row. Other requests, which may write to the user, and
+    tokens issued before the last change of the user load the row.
+    """
+
+    def authenticate(self, request):
+        start = time.perf_counter()
+        try:
+            header = self.get_header(request)
+            if header is None:
+                return None
+
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+
+            validated_token = self.get_validated_token(raw_token)
+            if request.method in SAFE_METHODS:
+                user = self.get_stateless_user(validated_token)
+                if user is not None:
+                    return user, validated_token
+            return self.get_user(validated_token), validated_token
+        finally:
+            metrics.record('auth', time.perf_counter() - start)
+
+    def get_stateless_user(self, validated_token):
+        """Return a user backed by the token when its claims are current"""
+        if get_setting('STATELESS_AUTH', 'ENABLED') \
+                and api_settings.USER_ID_CLAIM in validated_token \
+                and is_current(validated_token):
+            return StatelessUser(validated_token)
+        return None
+
+    def get_user(self, validated_token):
+        """Return the user, with the permission bits of the token if any"""
+        user = super().get_user(validated_token)
+        if get_setting('PERMISSIONS', 'IN_TOKEN') \
+                and 'perms' in validated_token:
+            user.permission_bits = decode_bits(validated_token['perms'])
+        return user
+
+    def get_validated_token(self, raw_token):
+        """Validate a raw token against each of the auth token classes"""
+        messages = []
+        for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
+            try:
+                return get_verified_token(AuthToken, raw_token)
+            except TokenError as e:
+                messages.append({
+                    'token_class': AuthToken.__name__,
+                    'token_type': AuthToken.token_type,
+                    'message': e.args[0],
+                })
+
+        raise InvalidToken({
+            'detail': _('Given token not valid for any token type'),
+            'messages': messages,
+        })
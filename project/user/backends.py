@@ -0,0 +1,49 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .permission_bits import get_permission_bits, get_registry
+
+
+class PermissionBitsBackend(ModelBackend):
+    """
+    ModelBackend answering permission checks from precomputed bits.
+
+    A user's permissions, direct and through groups, are read once into a
+    bitset over the permission registry and cached until a group or
+    permission change invalidates them. Checks then cost no query. When the
+    authenticated token carries the bits they are used as they are.
+    """
+
+    def _get_permission_bits(self, user_obj):
+        bits = getattr(user_obj, 'permission_bits', None)
+        if bits is None:
+            bits = user_obj.permission_bits = get_permission_bits(user_obj.pk)
+        return bits
+
+    def _is_checked(self, user_obj, obj):
+        return user_obj.is_active and not user_obj.is_anonymous \
+            and obj is None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not self._is_checked(user_obj, obj) or user_obj.is_superuser:
+            return super().get_all_permissions(user_obj, obj)
+        return get_registry().permission_names(
+            self._get_permission_bits(user_obj)
+        )
+
+    def has_perm(self, user_obj, perm, obj=None):
+        # Active superusers hold every permission, as with ModelBackend
+        if user_obj.is_active and user_obj.is_superuser:
+            return True
+        if not self._is_checked(user_obj, obj):
+            return False
+        bit = get_registry().bit(perm)
+        return bit is not None \
+            and bool(self._get_permission_bits(user_obj) >> bit & 1)
+
+    def has_module_perms(self, user_obj, app_label):
+        if user_obj.is_active and user_obj.is_superuser:
+            return True
+        if not self._is_checked(user_obj, None):
+            return False
+        mask = get_registry().app_mask(app_label)
+        return bool(mask & self._get_permission_bits(user_obj))
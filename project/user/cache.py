@@ -0,0 +1,116 @@
+import secrets
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'user:version:{}'
+
+
+def get_user_version(user_id):
+    """
+    Return the current version of a user, an opaque string that changes
+    every time the user row changes.
+
+    Read the version before the row it describes: a change landing in
+    between then leaves the row ahead of the version, never behind it.
+    """
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, secrets.token_hex(8), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    """Give a user a new version after its row changed"""
+    cache.set(VERSION_KEY.format(user_id), secrets.token_hex(8), timeout=None)
+
+
+PERMISSIONS_KEY = 'user:permissions:{}'
+PERMISSIONS_VERSION_KEY = 'permissions:version'
+PERMISSIONS_USER_VERSION_KEY = 'user:permissions:version:{}'
+
+
+def get_cached_permissions(user_id):
+    """
+    Return the permission bits cached for a user and the current version of
+    its permissions. The bits are None when they are missing or were
+    computed before the last change to the user's groups or permissions.
+
+    Bits computed after this call must be cached with the version returned
+    here, so a change landing during the computation leaves them unused.
+    """
+    key = PERMISSIONS_KEY.format(user_id)
+    version_keys = [PERMISSIONS_VERSION_KEY,
+                    PERMISSIONS_USER_VERSION_KEY.format(user_id)]
+    values = cache.get_many([key, *version_keys])
+    for version_key in version_keys:
+        if version_key not in values:
+            cache.add(version_key, secrets.token_hex(8), timeout=None)
+            values[version_key] = cache.get(version_key)
+
+    version = tuple(values[version_key] for version_key in version_keys)
+    if values.get(key, (None,))[0] != version:
+        return None, version
+    return values[key][1], version
+
+
+def set_cached_permissions(user_id, bits, version, timeout=None):
+    """Cache permission bits computed after get_cached_permissions"""
+    cache.set(PERMISSIONS_KEY.format(user_id), (version, bits), timeout)
+
+
+def invalidate_user_permissions(*user_ids):
+    """Invalidate the cached permission bits of some users"""
+    cache.set_many({
+        PERMISSIONS_USER_VERSION_KEY.format(pk): secrets.token_hex(8)
+        for pk in user_ids
+    }, timeout=None)
+
+
+def bump_permissions_version():
+    """Invalidate the cached permission bits of every user"""
+    cache.set(PERMISSIONS_VERSION_KEY, secrets.token_hex(8), timeout=None)
+
+
+PROFILE_KEY = 'user:profile:{}'
+
+
+def get_cached_profiles(user_ids):
+    """
+    Return the cached public fields of some users keyed by user id, and the
+    current version of every user.
+
+    A profile is only returned when it was cached under the current version
+    of its user. Profiles read from the database must be cached with the
+    versions returned here, read before the rows, so a change landing in
+    between leaves a profile that is never served.
+    """
+    version_keys = {VERSION_KEY.format(pk): pk for pk in user_ids}
+    profile_keys = {PROFILE_KEY.format(pk): pk for pk in user_ids}
+    values = cache.get_many(list(version_keys) + list(profile_keys))
+
+    versions = {pk: values[key] for key, pk in version_keys.items()
+                if key in values}
+    for pk in user_ids:
+        if pk not in versions:
+            versions[pk] = get_user_version(pk)
+
+    profiles = {}
+    for key, pk in profile_keys.items():
+        if key in values and values[key][0] == versions[pk]:
+            profiles[pk] = values[key][1]
+    return profiles, versions
+
+
+def set_cached_profiles(profiles, versions, timeout=None):
+    """
+    Cache the public fields of users, dictionaries with an id, under the
+    versions returned by get_cached_profiles
+    """
+    cache.set_many({
+        PROFILE_KEY.format(profile['id']):
+            (versions[profile['id']], profile)
+        for profile in profiles
+    }, timeout)
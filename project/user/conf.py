@@ -0,0 +1,57 @@
+from django.conf import settings
+
+
+DEFAULTS = {
+    'PASSWORD_HASHING': {
+        'WORKERS': None,
+        'SERVER_PROCESSES': 1,
+        'MAX_PENDING': None,
+        'QUEUE_TIMEOUT': 2.0,
+        'ITERATIONS': None,
+        'DEFER_REHASH': True,
+        'MAX_PENDING_REHASHES': 1000,
+    },
+    'BULK_REGISTRATION': {
+        'BATCH_SIZE': 500,
+        'MAX_USERS': 5000,
+    },
+    'USER_RESOLUTION': {
+        'MAX_IDS': 1000,
+        'STREAM_MIN_IDS': 200,
+        'CACHE_TIMEOUT': 3600,
+    },
+    'TOKEN_CACHE': {
+        'MAX_ENTRIES': 10000,
+        'TTL': 300,
+    },
+    'LAST_LOGIN': {
+        'FLUSH_INTERVAL': 10,
+        'BATCH_SIZE': 500,
+        'MAX_PENDING': 10000,
+    },
+    'PERMISSIONS': {
+        'IN_TOKEN': False,
+        'TIMEOUT': 3600,
+    },
+    'STATELESS_AUTH': {
+        'ENABLED': False,
+    },
+    'REVOCATION': {
+        'RATE': 10,
+        'CAPACITY': None,
+        'PATH': None,
+        'PERSIST_INTERVAL': 60,
+    },
+    'THROTTLING': {
+        'RATES': {},
+        'SLOTS': 65536,
+    },
+}
+
+
+def get_setting(name, key):
+    """
+    Return a single option of one of the dictionary settings of the user app,
+    falling back to the defaults above when the project does not define it.
+    """
+    return getattr(settings, name, {}).get(key, DEFAULTS[name][key])
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from designh import metrics
+
+from . import hashing
+from .conf import get_setting
+
+
+def _encode(password, salt, iterations):
+    """Encode a password with the stock PBKDF2 hasher inside a worker"""
+    return PBKDF2PasswordHasher().encode(password, salt, iterations)
+
+
+class OffloadedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher that runs the key derivation on the hashing executor.
+
+    The algorithm name and the encoded format are the same as the stock
+    hasher, so existing hashes keep working. Verification goes through
+    encode as well, which offloads both set_password and check_password.
+
+    The iteration count can be tuned with PASSWORD_HASHING['ITERATIONS'];
+    hashes with another count are upgraded at the next login.
+    """
+
+    @property
+    def iterations(self):
+        return get_setting('PASSWORD_HASHING', 'ITERATIONS') \
+            or PBKDF2PasswordHasher.iterations
+
+    def encode(self, password, salt, iterations=None):
+        start = time.perf_counter()
+        try:
+            if not hashing.is_offloaded():
+                return super().encode(password, salt, iterations)
+
+            return hashing.get_executor().run(
+                _encode, password, salt, iterations or self.iterations
+            )
+        finally:
+            metrics.record('hash', time.perf_counter() - start)
@@ -0,0 +1,154 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .conf import get_setting
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Set inside the worker processes so hashers encode inline there
+in_worker = False
+
+
+class HashingBusy(APIException):
+    """
+    Raised when too many hashing jobs are already waiting for the pool.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please try again later.'
+    default_code = 'hashing_busy'
+    wait = 1
+
+
+def _init_worker():
+    """Configure Django inside a freshly started worker process"""
+    global in_worker
+
+    in_worker = True
+    django.setup()
+
+
+class HashingExecutor:
+    """
+    Bounded process pool for password hashing and verification.
+
+    At most max_pending jobs may be queued or running at any time. Callers
+    wait up to queue_timeout seconds for a free slot and get HashingBusy
+    afterwards, which sheds a login storm instead of letting it pile up
+    behind the pool while the rest of the API stays responsive. Bulk jobs
+    block instead, so they are never cut short halfway.
+    """
+
+    def __init__(self, workers, max_pending, queue_timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+        )
+
+    def submit(self, fn, *args, block=False):
+        """
+        Queue a job on the pool once a slot is free and return its future,
+        with block wait for the slot however long it takes
+        """
+        timeout = None if block else self.queue_timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise HashingBusy()
+
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Run a job on the pool and wait for its result"""
+        return self.submit(fn, *args).result()
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        self._pool.shutdown(wait=wait)
+
+
+def default_workers():
+    """
+    Return this process's share of the CPUs, so the pools of all the server
+    processes together run about one hashing process per CPU
+    """
+    processes = get_setting('PASSWORD_HASHING', 'SERVER_PROCESSES')
+    return max(1, os.cpu_count() // max(1, processes))
+
+
+def get_executor():
+    """Return the hashing executor, creating it on first use"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            workers = get_setting('PASSWORD_HASHING', 'WORKERS') \
+                or default_workers()
+            _executor = HashingExecutor(
+                workers=workers,
+                max_pending=get_setting('PASSWORD_HASHING', 'MAX_PENDING')
+                or workers * 4,
+                queue_timeout=get_setting('PASSWORD_HASHING',
+                                          'QUEUE_TIMEOUT'),
+            )
+        return _executor
+
+
+def reset_executor():
+    """
+    Forget the executor in a process forked from its owner, whose worker
+    processes it cannot use or shut down
+    """
+    global _executor
+
+    with _executor_lock:
+        _executor = None
+
+
+def is_offloaded():
+    """Return whether hashing should go through the executor"""
+    return not in_worker and get_setting('PASSWORD_HASHING', 'WORKERS') != 0
+
+
+def hash_passwords(passwords):
+    """
+    Hash a list of raw passwords across the process pool and return the
+    encoded passwords in the same order.
+
+    The list is split in at most max_pending chunks, each submitted once a
+    slot is free, so a bulk job waits for the pool rather than failing with
+    HashingBusy after part of it was hashed.
+    """
+    if len(passwords) <= 1 or not is_offloaded():
+        return [make_password(password) for password in passwords]
+
+    executor = get_executor()
+    chunks = min(executor.max_pending, len(passwords))
+    chunksize = math.ceil(len(passwords) / chunks)
+    futures = [
+        executor.submit(_make_passwords, passwords[start:start + chunksize],
+                        block=True)
+        for start in range(0, len(passwords), chunksize)
+    ]
+    return [encoded for future in futures for encoded in future.result()]
+
+
+def _make_passwords(passwords):
+    """Hash a chunk of passwords inside a worker process"""
+    return [make_password(password) for password in passwords]
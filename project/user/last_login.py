@@ -0,0 +1,147 @@
+import atexit
+import logging
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from .conf import get_setting
+
+
+logger = logging.getLogger(__name__)
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+class LastLoginRecorder:
+    """
+    Write-behind buffer of login times.
+
+    Logins only store the time in memory, keeping the latest one per user,
+    and a background thread writes the buffer every flush_interval seconds
+    with bulk_update, one CASE statement per batch_size users. The number
+    of writes follows the number of distinct users that logged in during an
+    interval, not the login rate. A buffer reaching max_pending users is
+    flushed early and, while the database cannot take the writes, drops its
+    oldest logins past max_pending.
+
+    Whatever is left is flushed when the process exits normally, from an
+    atexit handler and the gunicorn worker_exit hook, which covers runserver
+    and management commands too. A process killed with SIGKILL or crashing
+    loses the logins of up to its last flush_interval seconds. Without a
+    flush_interval no thread is started and only flush() writes, which the
+    test runner uses so no thread writes behind the tests' back.
+    """
+
+    def __init__(self, flush_interval, batch_size, max_pending):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flushed = 0
+        self.statements = 0
+        self.dropped = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, when):
+        """Remember that a user logged in at when"""
+        with self._lock:
+            # Threads do not survive a fork, start one in every process
+            if self.flush_interval is not None and (
+                    self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(
+                    target=self._run, name='last-login', daemon=True
+                )
+                self._thread.start()
+            self._record_locked(user_id, when)
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def _record_locked(self, user_id, when):
+        previous = self._pending.get(user_id)
+        if previous is not None and previous >= when:
+            return
+        # Keep the buffer ordered by insertion, so the oldest logins go first
+        self._pending.pop(user_id, None)
+        self._pending[user_id] = when
+        while len(self._pending) > self.max_pending:
+            del self._pending[next(iter(self._pending))]
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """
+        Write the buffered login times and return how many were written.
+        Times that could not be written are kept for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            User = get_user_model()
+            users = [User(pk=user_id, last_login=when)
+                     for user_id, when in pending.items()]
+            try:
+                User._default_manager.bulk_update(
+                    users, ['last_login'], batch_size=self.batch_size
+                )
+            except Exception:
+                logger.exception('Could not record %d last logins',
+                                 len(users))
+                # Keep the times for the next flush, unless newer ones came
+                with self._lock:
+                    for user_id, when in pending.items():
+                        self._record_locked(user_id, when)
+                return 0
+            with self._lock:
+                self.flushed += len(users)
+                self.statements += -(-len(users) // self.batch_size)
+            return len(users)
+
+    def stats(self):
+        """Return the pending, flushed, statement and dropped counters"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'flushed': self.flushed,
+                'statements': self.statements,
+                'dropped': self.dropped,
+            }
+
+
+def get_last_login_recorder():
+    """Return the process wide last login recorder"""
+    global _recorder
+
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LastLoginRecorder(
+                flush_interval=get_setting('LAST_LOGIN', 'FLUSH_INTERVAL'),
+                batch_size=get_setting('LAST_LOGIN', 'BATCH_SIZE'),
+                max_pending=get_setting('LAST_LOGIN', 'MAX_PENDING'),
+            )
+            # Inherited by forked processes, each flushes its own buffer
+            atexit.register(_recorder.flush)
+        return _recorder
+
+
+def last_login_metrics():
+    """Return the last login recorder counters as metrics"""
+    return {
+        f'last_login_{name}': value
+        for name, value in get_last_login_recorder().stats().items()
+    }
@@ -0,0 +1,126 @@
+import math
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, \
+    get_hashers, identify_hasher
+from django.core.management.base import BaseCommand
+
+
+# Work factor attribute of the hashers shipped with Django and how the cost
+# grows with it: linearly, linearly but restricted to powers of two, or
+# doubling with every step
+WORK_FACTORS = (
+    ('iterations', 'linear'),
+    ('time_cost', 'linear'),
+    ('work_factor', 'power_of_two'),
+    ('rounds', 'log2'),
+)
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the configured password hashers on this host.
+    """
+    help = ('Time the password hashers, recommend work factors for a '
+            'latency budget and report the users on outdated parameters.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0,
+                            help='Latency budget of one hash.')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Hashes timed per hasher.')
+        parser.add_argument('--skip-users', action='store_true',
+                            help='Do not scan the stored hashes.')
+
+    def handle(self, *args, **options):
+        for hasher in get_hashers():
+            self.calibrate(hasher, options['target_ms'], options['rounds'])
+        if not options['skip_users']:
+            self.report_outdated()
+
+    def time_hash(self, hasher, rounds):
+        """Return the median time of one hash in milliseconds"""
+        salt = hasher.salt()
+        hasher.encode('calibration', salt)
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            hasher.encode('calibration', salt)
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
+
+    def calibrate(self, hasher, target_ms, rounds):
+        try:
+            elapsed = self.time_hash(hasher, rounds)
+        except ValueError as e:
+            # The library of the hasher is not installed
+            self.stdout.write(f'{hasher.algorithm}: skipped, {e}')
+            return
+
+        line = f'{hasher.algorithm}: {elapsed:.1f}ms per hash'
+        for attribute, scale in WORK_FACTORS:
+            current = getattr(hasher, attribute, None)
+            if not isinstance(current, int):
+                continue
+            # Doublings of the cost that fit in the budget
+            steps = math.floor(math.log2(target_ms / elapsed))
+            if scale == 'linear':
+                recommended = max(1, round(current * target_ms / elapsed))
+                if recommended > 10000:
+                    recommended = round(recommended, -4)
+            elif scale == 'power_of_two':
+                recommended = max(2, int(current * 2 ** steps))
+            else:
+                recommended = max(4, current + steps)
+            line += (f' with {attribute}={current}, recommended '
+                     f'{attribute}={recommended} for {target_ms:.0f}ms')
+            break
+        self.stdout.write(line)
+
+    def report_outdated(self):
+        """Print the share of stored hashes per algorithm and parameters"""
+        preferred = get_hashers()[0]
+        groups, samples = Counter(), {}
+        passwords = get_user_model()._default_manager \
+            .values_list('password', flat=True).iterator(chunk_size=5000)
+        for encoded in passwords:
+            if not encoded or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+                groups['no password'] += 1
+                continue
+            try:
+                hasher = identify_hasher(encoded)
+                decoded = hasher.decode(encoded)
+            except ValueError:
+                groups['unknown algorithm'] += 1
+                continue
+            parameters = ' '.join([hasher.algorithm] + [
+                f'{name}={value}' for name, value in sorted(decoded.items())
+                if name not in ('algorithm', 'salt', 'hash')
+            ])
+            groups[parameters] += 1
+            samples.setdefault(parameters, (hasher, encoded))
+
+        total = sum(groups.values())
+        if not total:
+            self.stdout.write('No users.')
+            return
+
+        outdated = 0
+        self.stdout.write(f'\n{total} users by hash parameters:')
+        for parameters, count in groups.most_common():
+            state = ''
+            if parameters in samples:
+                hasher, encoded = samples[parameters]
+                state = 'current'
+                if hasher.algorithm != preferred.algorithm or \
+                        hasher.must_update(encoded):
+                    state = 'outdated'
+                    outdated += count
+            self.stdout.write(f'  {parameters:<50}{count:>10}'
+                              f'{count / total:>8.1%}  {state}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{outdated / total:.1%} of users are on outdated parameters '
+            f'and will be rehashed at their next login.'
+        ))
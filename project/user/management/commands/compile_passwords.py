@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from user.password_validation import DJANGO_PASSWORD_LIST, \
+    write_password_list
+
+
+class Command(BaseCommand):
+    """
+    Compile common and breached password lists for PasswordPolicyValidator.
+    """
+    help = 'Compile password lists into the memory-mapped lookup format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the compiled list.')
+        parser.add_argument(
+            '--plain', action='append', default=[], metavar='PATH',
+            help='List with one password per line, may be gzipped.',
+        )
+        parser.add_argument(
+            '--sha1', action='append', default=[], metavar='PATH',
+            help='List with one SHA-1 hex digest per line, may be gzipped.',
+        )
+        parser.add_argument(
+            '--no-default', action='store_true',
+            help='Do not include the list Django ships with.',
+        )
+
+    def handle(self, *args, **options):
+        plain = options['plain']
+        if not options['no_default']:
+            plain = [DJANGO_PASSWORD_LIST] + plain
+
+        with open(options['output'], 'wb') as f:
+            count = write_password_list(f, plain, options['sha1'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {count} passwords "
+            f"into {options['output']}"
+        ))
@@ -0,0 +1,74 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.transfer import FORMATS, Checkpoint, csv_header, dump_row, \
+    guess_format, iter_users, peak_rss
+
+
+class Command(BaseCommand):
+    """
+    Stream every user to an NDJSON or CSV file with constant memory.
+    """
+    help = 'Export users, with their password hashes, to NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the export, - for stdout.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the extension of output.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the cursor at a time.')
+        parser.add_argument('--checkpoint', metavar='PATH',
+                            help='Defaults to output with .checkpoint added.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Append the users missing after an '
+                                 'interrupted export.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or guess_format(output)
+        to_stdout = output == '-'
+        if to_stdout and options['resume']:
+            raise CommandError('Cannot resume an export written to stdout.')
+
+        checkpoint = None
+        if not to_stdout:
+            checkpoint = Checkpoint(
+                options['checkpoint'] or f'{output}.checkpoint'
+            )
+        position = checkpoint.load() if options['resume'] else {}
+        after_id = position.get('id', 0)
+
+        if to_stdout:
+            f = sys.stdout
+        else:
+            f = open(output, 'r+' if after_id else 'w', newline='')
+            # Drop whatever was written after the last checkpoint
+            f.seek(position.get('offset', 0))
+            f.truncate()
+
+        start, count = time.perf_counter(), 0
+        try:
+            if fmt == 'csv' and not after_id:
+                f.write(csv_header())
+            for last_id, row in iter_users(after_id, options['chunk_size'],
+                                           options['database']):
+                f.write(dump_row(row, fmt))
+                count += 1
+                if checkpoint and count % options['chunk_size'] == 0:
+                    f.flush()
+                    checkpoint.save(id=last_id, offset=f.tell())
+        finally:
+            if not to_stdout:
+                f.close()
+
+        if checkpoint:
+            checkpoint.clear()
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {count} users in {elapsed:.1f}s '
+            f'({count / elapsed if elapsed else 0:.0f} rows/s), '
+            f'peak RSS {peak_rss() / 2 ** 20:.1f} MiB'
+        ))
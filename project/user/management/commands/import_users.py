@@ -0,0 +1,58 @@
+import itertools
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from user.transfer import FORMATS, Checkpoint, guess_format, insert_rows, \
+    load_row, peak_rss, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Load users exported with export_users in chunks with constant memory.
+    """
+    help = ('Import users from NDJSON or CSV, keeping their password hashes '
+            'and skipping emails that already exist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Path of the export to load.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the extension of input.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows inserted per statement.')
+        parser.add_argument('--checkpoint', metavar='PATH',
+                            help='Defaults to input with .checkpoint added.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the rows loaded by an interrupted '
+                                 'import.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        path, database = options['input'], options['database']
+        fmt = options['format'] or guess_format(path)
+        batch_size = options['batch_size']
+        checkpoint = Checkpoint(options['checkpoint'] or f'{path}.checkpoint')
+        done = checkpoint.load().get('rows', 0) if options['resume'] else 0
+
+        users = get_user_model().objects.using(database)
+        before = users.count()
+        start, count = time.perf_counter(), 0
+        with open(path, newline='') as f:
+            rows = itertools.islice(read_rows(f, fmt), done, None)
+            while True:
+                chunk = [load_row(row)
+                         for row in itertools.islice(rows, batch_size)]
+                if not chunk:
+                    break
+                insert_rows(chunk, database)
+                count += len(chunk)
+                checkpoint.save(rows=done + count)
+
+        checkpoint.clear()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {count} rows and created {users.count() - before} users '
+            f'in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} '
+            f'rows/s), peak RSS {peak_rss() / 2 ** 20:.1f} MiB'
+        ))
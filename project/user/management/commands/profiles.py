@@ -0,0 +1,62 @@
+import io
+import os
+import pstats
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from designh.profiling import get_ring
+
+
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+
+class Command(BaseCommand):
+    """
+    Report on the request profiles taken by ProfilingMiddleware.
+    """
+    help = ('List the stored request profiles and aggregate them into the '
+            'hottest functions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view',
+                            help='Only the profiles of this view name.')
+        parser.add_argument('--last', type=int, metavar='N',
+                            help='Only the N latest profiles.')
+        parser.add_argument('--top', type=int, default=25,
+                            help='Functions shown in the aggregate.')
+        parser.add_argument('--sort', choices=SORT_KEYS,
+                            default='cumulative')
+        parser.add_argument('--list', action='store_true',
+                            help='List the profiles without aggregating.')
+
+    def handle(self, *args, **options):
+        profiles = get_ring().profiles()
+        if options['view']:
+            view = options['view'].replace(':', '.')
+            profiles = [profile for profile in profiles
+                        if profile.view == view]
+        if options['last']:
+            profiles = profiles[-options['last']:]
+        if not profiles:
+            self.stdout.write('No profiles.')
+            return
+
+        for profile in profiles:
+            created = datetime.fromtimestamp(profile.created)
+            self.stdout.write(
+                f'{created:%Y-%m-%d %H:%M:%S}  {profile.pid:>7}  '
+                f'{profile.duration * 1000:>9.1f}ms  {profile.view:<40}'
+                f'{os.path.basename(profile.path)}'
+            )
+        if options['list']:
+            return
+
+        self.stdout.write(f'\nTop {options["top"]} functions over '
+                          f'{len(profiles)} profiles:')
+        report = io.StringIO()
+        stats = pstats.Stats(*[profile.path for profile in profiles],
+                             stream=report)
+        stats.strip_dirs().sort_stats(options['sort']) \
+            .print_stats(options['top'])
+        self.stdout.write(report.getvalue())
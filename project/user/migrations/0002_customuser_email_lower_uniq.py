@@ -0,0 +1,18 @@
+# Generated by Django 4.0.3 on 2026-10-17 02:58
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_customuser_email_lower_uniq'),
+        ),
+    ]
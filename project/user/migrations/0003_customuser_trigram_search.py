@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+INDEXES = {
+    'user_customuser_email_trgm': 'email',
+    'user_customuser_name_trgm': 'name',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Index UPPER(column::text) with trigrams, the expression the admin search
+    compares with LIKE through icontains on PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON user_customuser '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_customuser_email_lower_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
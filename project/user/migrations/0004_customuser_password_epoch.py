@@ -0,0 +1,18 @@
+# Generated by Django 4.0.3 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_customuser_trigram_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='password_epoch',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,13 +1,31 @@
-from django.db import models
+from django.contrib.auth.hashers import check_password
+from django.db import IntegrityError, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 
+from .conf import get_setting
+from .hashing import hash_passwords
+from .rehash import get_rehasher
+
 
 class CustomUserManager(BaseUserManager):
     """
     Create a custom manager for the creation of users and superusers.
     """
 
+    def get_by_natural_key(self, email):
+        """
+        Return the user with the given email regardless of its case.
+
+        Compares LOWER(email) so the lookup uses the case-insensitive unique
+        index instead of scanning the table.
+        """
+        return self.alias(email_lower=Lower('email')).get(
+            email_lower=Lower(Value(email))
+        )
+
     def create_user(self, email, password, **extra_fields):
         """Create a new user and save it in the database"""
         if not email:
@@ -21,11 +39,92 @@ class CustomUserManager(BaseUserManager):
 
     def create_superuser(self, email, password, **extra_fields):
         """Create a new superuser and save it in the database"""
-        user = self.create_user(email, password, **extra_fields)
-        user.is_staff = True
-        user.is_superuser = True
-        user.save(using=self._db)
-        return user
+        extra_fields.setdefault('is_staff', True)
+        extra_fields.setdefault('is_superuser', True)
+        return self.create_user(email, password, **extra_fields)
+
+    def bulk_create_users(self, users, batch_size=None):
+        """
+        Create many users at once from a list of dictionaries holding the
+        same fields accepted by create_user.
+
+        Passwords are hashed in parallel across the hashing process pool
+        before anything is written, then rows are inserted with bulk_create
+        in chunks of batch_size inside a single transaction, so an error
+        leaves no user of the batch behind. Rows that cannot be created do
+        not fail the whole batch; a tuple of the created users and a
+        dictionary of errors keyed by row index is returned.
+        """
+        if batch_size is None:
+            batch_size = get_setting('BULK_REGISTRATION', 'BATCH_SIZE')
+
+        created, errors = [], {}
+        pending, seen = [], set()
+
+        for index, data in enumerate(users):
+            extra_fields = dict(data)
+            email = extra_fields.pop('email', None)
+            if not email:
+                errors[index] = {'email': ['Email field is required.']}
+                continue
+
+            email = self.normalize_email(email)
+            if email.lower() in seen:
+                errors[index] = {'email': ['Duplicate email in batch.']}
+                continue
+
+            seen.add(email.lower())
+            password = extra_fields.pop('password', None)
+            pending.append((index, email, password, extra_fields))
+
+        existing = set()
+        for start in range(0, len(pending), batch_size):
+            existing.update(
+                email.lower() for email in self.alias(
+                    email_lower=Lower('email')
+                ).filter(email_lower__in=[
+                    email.lower() for _, email, _, _ in
+                    pending[start:start + batch_size]
+                ]).values_list('email', flat=True)
+            )
+        for index, email, _, _ in pending:
+            if email.lower() in existing:
+                errors[index] = {
+                    'email': ['User with this email already exists.']
+                }
+        pending = [row for row in pending if row[1].lower() not in existing]
+
+        hashed = hash_passwords([password for _, _, password, _ in pending])
+        objs = [
+            self.model(email=email, password=encoded, **extra_fields)
+            for (_, email, _, extra_fields), encoded in zip(pending, hashed)
+        ]
+
+        with transaction.atomic(using=self._db):
+            for start in range(0, len(pending), batch_size):
+                chunk = list(zip(pending[start:start + batch_size],
+                                 objs[start:start + batch_size]))
+                try:
+                    with transaction.atomic(using=self._db):
+                        created.extend(self.bulk_create(
+                            [obj for _, obj in chunk]
+                        ))
+                except IntegrityError:
+                    # Another request inserted one of the emails in the
+                    # meantime, retry this chunk row by row to isolate the
+                    # conflicts.
+                    for (index, _, _, _), obj in chunk:
+                        try:
+                            with transaction.atomic(using=self._db):
+                                obj.save(using=self._db)
+                        except IntegrityError:
+                            errors[index] = {'email': [
+                                'User with this email already exists.'
+                            ]}
+                        else:
+                            created.append(obj)
+
+        return created, errors
 
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
@@ -37,7 +136,35 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped when the user changes the password, not when a hash is upgraded
+    password_epoch = models.PositiveIntegerField(default=0, editable=False)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
+
+    def change_password(self, raw_password):
+        """Set a password chosen by the user, revoking its refresh tokens"""
+        self.set_password(raw_password)
+        self.password_epoch += 1
+
+    def check_password(self, raw_password):
+        """
+        Return whether raw_password is correct, queueing the upgrade of an
+        outdated hash to the background rehasher instead of doing it inline
+        """
+        if not get_setting('PASSWORD_HASHING', 'DEFER_REHASH'):
+            return super().check_password(raw_password)
+
+        encoded = self.password
+        return check_password(
+            raw_password, encoded,
+            lambda raw: get_rehasher().submit(self.pk, raw, encoded),
+        )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower('email'), name='user_customuser_email_lower_uniq'
+            ),
+        ]
@@ -0,0 +1,277 @@
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import mmap
+import string
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+
+MAGIC = b'PWL1'
+HEADER = struct.Struct('>4sQ')
+ENTRY = struct.Struct('>Q')
+# Fingerprints sorted in memory at once while compiling, about 50MB of
+# Python integers
+RUN_SIZE = 1 << 20
+# Fingerprints read or written per call while compiling
+IO_CHUNK = 1 << 13
+
+DJANGO_PASSWORD_LIST = Path(password_validation.__file__).resolve().parent \
+    / 'common-passwords.txt.gz'
+
+ASCII_LETTERS = frozenset(string.ascii_letters)
+ASCII_DIGITS = frozenset(string.digits)
+
+
+def fingerprint(sha1_digest):
+    """Return the 64 bit fingerprint stored for a SHA-1 digest"""
+    return ENTRY.unpack_from(sha1_digest)[0]
+
+
+def password_fingerprint(password):
+    """Return the fingerprint of a raw password"""
+    return fingerprint(hashlib.sha1(password.encode()).digest())
+
+
+def read_lines(path):
+    """Yield the stripped lines of a plain or gzipped text file"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            yield from (line.strip() for line in f)
+    except OSError:
+        with open(path, encoding='utf-8') as f:
+            yield from (line.strip() for line in f)
+
+
+def _fingerprints(plain_paths, sha1_paths):
+    """Yield the fingerprint of every entry of some password lists"""
+    for path in plain_paths:
+        yield from (
+            password_fingerprint(line.lower())
+            for line in read_lines(path) if line
+        )
+    for path in sha1_paths:
+        yield from (
+            fingerprint(bytes.fromhex(line.split(':', 1)[0]))
+            for line in read_lines(path) if line
+        )
+
+
+def _unique(values):
+    """Yield the values of a sorted iterable once each"""
+    previous = None
+    for value in values:
+        if value != previous:
+            yield value
+            previous = value
+
+
+def _write_values(f, values, byteswap=False):
+    """Write fingerprints a chunk at a time and return their count"""
+    values = iter(values)
+    count = 0
+    while True:
+        chunk = array('Q', itertools.islice(values, IO_CHUNK))
+        if not chunk:
+            return count
+        if byteswap:
+            chunk.byteswap()
+        f.write(chunk.tobytes())
+        count += len(chunk)
+
+
+def _read_values(f):
+    """Yield the fingerprints written to f a chunk at a time"""
+    f.seek(0)
+    while True:
+        data = f.read(IO_CHUNK * ENTRY.size)
+        if not data:
+            return
+        chunk = array('Q')
+        chunk.frombytes(data)
+        yield from chunk
+
+
+def write_password_list(f, plain_paths=(), sha1_paths=(), run_size=RUN_SIZE):
+    """
+    Compile password lists into the on-disk lookup format, write it to the
+    seekable binary file f and return the number of entries.
+
+    Plain lists hold one password per line and are lowercased like the list
+    Django ships with. SHA-1 lists hold one hex digest per line, optionally
+    followed by ':count' as in the Have I Been Pwned downloads. The output is
+    a header followed by the sorted, deduplicated 64 bit prefixes of the
+    SHA-1 digests, so a lookup is a binary search over a flat array.
+
+    At most run_size fingerprints are sorted in memory at once. Longer lists
+    are sorted in runs spilled to temporary files and merged, so compiling
+    the breach lists takes constant memory.
+    """
+    byteswap = sys.byteorder == 'little'
+    fingerprints = _fingerprints(plain_paths, sha1_paths)
+    # The count is only known at the end, the header is written again then
+    f.write(HEADER.pack(MAGIC, 0))
+
+    runs = []
+    try:
+        while True:
+            run = sorted(itertools.islice(fingerprints, run_size))
+            if not runs and len(run) < run_size:
+                count = _write_values(f, _unique(run), byteswap)
+                break
+            if not run:
+                count = _write_values(f, _unique(heapq.merge(
+                    *[_read_values(run_file) for run_file in runs]
+                )), byteswap)
+                break
+            runs.append(tempfile.TemporaryFile())
+            _write_values(runs[-1], _unique(run))
+            del run
+    finally:
+        for run_file in runs:
+            run_file.close()
+
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, count))
+    f.seek(0, io.SEEK_END)
+    return count
+
+
+def compile_password_list(plain_paths=(), sha1_paths=()):
+    """Compile password lists in memory, see write_password_list"""
+    f = io.BytesIO()
+    write_password_list(f, plain_paths, sha1_paths)
+    return f.getvalue()
+
+
+class PasswordList:
+    """
+    Membership test against a compiled password list.
+
+    The list is memory-mapped read only, so the pages are shared by every
+    worker on the host through the page cache and nothing is parsed at
+    startup, whatever the size of the list.
+    """
+
+    def __init__(self, data):
+        magic, self.count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a compiled password list.')
+        self._data = data
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a compiled list from disk"""
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, password):
+        return (
+            self._search(password_fingerprint(password.lower().strip()))
+            or self._search(password_fingerprint(password))
+        )
+
+    def _search(self, value):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            current = ENTRY.unpack_from(
+                self._data, HEADER.size + middle * ENTRY.size
+            )[0]
+            if current < value:
+                low = middle + 1
+            elif current > value:
+                high = middle
+            else:
+                return True
+        return False
+
+
+class PasswordPolicyValidator:
+    """
+    Validate the password policy of the project in a single pass.
+
+    Replaces MinimumLengthValidator, NumericPasswordValidator and
+    CommonPasswordValidator, and the regular expressions previously run by
+    UserSerializer. The common password list is read from a file compiled
+    with the compile_passwords management command; when that file does not
+    exist the list Django ships with is compiled in memory instead.
+    """
+
+    def __init__(self, min_length=9, password_list_path=None):
+        self.min_length = min_length
+        self.password_list_path = password_list_path
+        self._passwords = None
+        self._lock = threading.Lock()
+
+    @property
+    def passwords(self):
+        """Return the common password list, loading it on first use"""
+        if self._passwords is None:
+            with self._lock:
+                if self._passwords is None:
+                    self._passwords = self._load()
+        return self._passwords
+
+    def _load(self):
+        if self.password_list_path and Path(self.password_list_path).exists():
+            return PasswordList.open(self.password_list_path)
+
+        return PasswordList(compile_password_list([DJANGO_PASSWORD_LIST]))
+
+    def validate(self, password, user=None):
+        has_letter = has_digit = has_whitespace = False
+        for char in password:
+            if char in ASCII_LETTERS:
+                has_letter = True
+            elif char in ASCII_DIGITS:
+                has_digit = True
+            elif char.isspace():
+                has_whitespace = True
+
+        errors = []
+        if len(password) < self.min_length:
+            errors.append(ValidationError(
+                _('Password must be longer than %(length)d characters'),
+                code='password_too_short',
+                params={'length': self.min_length - 1},
+            ))
+        if has_whitespace:
+            errors.append(ValidationError(
+                _('Password cannot contain whitespace characters'),
+                code='password_whitespace',
+            ))
+        if not (has_letter and has_digit):
+            errors.append(ValidationError(
+                _('Password must contain one letter character '
+                  'and one number character'),
+                code='password_not_alphanumeric',
+            ))
+        if not errors and password in self.passwords:
+            errors.append(ValidationError(
+                _('This password is too common.'),
+                code='password_too_common',
+            ))
+
+        if errors:
+            raise ValidationError(errors)
+
+    def get_help_text(self):
+        return _(
+            'Your password must be longer than %(length)d characters, '
+            'contain a letter and a number, no whitespace and cannot be a '
+            'commonly used password.'
+        ) % {'length': self.min_length - 1}
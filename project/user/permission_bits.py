@@ -0,0 +1,122 @@
+import base64
+import threading
+import time
+
+from django.contrib.auth.models import Permission
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import get_cached_permissions, set_cached_permissions
+from .conf import get_setting
+
+
+# Seconds before an unknown permission name may reload the registry again
+RELOAD_INTERVAL = 60
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+class PermissionRegistry:
+    """
+    Mapping of 'app_label.codename' permission names to bit positions.
+
+    A permission's bit is its primary key, so the bits of a user stay valid
+    across processes and restarts. Permissions only appear through
+    migrations, the registry reloads itself when it is asked for a name it
+    does not know, at most once every RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._load()
+
+    def _load(self):
+        bits = {
+            f'{app_label}.{codename}': pk
+            for pk, app_label, codename in Permission.objects.values_list(
+                'pk', 'content_type__app_label', 'codename'
+            )
+        }
+        app_masks = {}
+        for name, bit in bits.items():
+            app_label = name.split('.', 1)[0]
+            app_masks[app_label] = app_masks.get(app_label, 0) | 1 << bit
+
+        self.loaded = time.monotonic()
+        self.names = {bit: name for name, bit in bits.items()}
+        self.app_masks = app_masks
+        self.bits = bits
+
+    def bit(self, name):
+        """Return the bit of a permission name or None when it is unknown"""
+        if name not in self.bits and \
+                time.monotonic() - self.loaded > RELOAD_INTERVAL:
+            with _registry_lock:
+                self._load()
+        return self.bits.get(name)
+
+    def app_mask(self, app_label):
+        """Return the bits of every permission of an app"""
+        return self.app_masks.get(app_label, 0)
+
+    def permission_names(self, bits):
+        """Return the names of the permissions set in bits"""
+        return {name for bit, name in self.names.items() if bits >> bit & 1}
+
+
+def get_registry():
+    """Return the process wide permission registry"""
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = PermissionRegistry()
+        return _registry
+
+
+def compute_permission_bits(user_id):
+    """
+    Return the bits of the permissions a user holds directly or through
+    its groups, read with a single query from the primary, as the bits
+    are cached right after a change invalidated them.
+    """
+    permissions = Permission.objects.using(DEFAULT_DB_ALIAS)
+    # Permission is ordered by default, which compound queries reject
+    direct = permissions.filter(user__pk=user_id) \
+        .values_list('pk').order_by()
+    grouped = permissions.filter(group__user__pk=user_id) \
+        .values_list('pk').order_by()
+    bits = 0
+    for pk, in direct.union(grouped):
+        bits |= 1 << pk
+    return bits
+
+
+def get_permission_bits(user_id):
+    """Return the permission bits of a user, from the cache when possible"""
+    bits, version = get_cached_permissions(user_id)
+    if bits is None:
+        bits = compute_permission_bits(user_id)
+        set_cached_permissions(user_id, bits, version,
+                               get_setting('PERMISSIONS', 'TIMEOUT'))
+    return bits
+
+
+def encode_bits(bits):
+    """Return permission bits as a compact URL safe string"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def decode_bits(value):
+    """Return the permission bits encoded by encode_bits"""
+    data = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    return int.from_bytes(data, 'little')
+
+
+def add_permission_claim(token, user_id):
+    """
+    Embed the current permission bits of a user in a token when
+    PERMISSIONS['IN_TOKEN'] is on.
+    """
+    if get_setting('PERMISSIONS', 'IN_TOKEN'):
+        token['perms'] = encode_bits(get_permission_bits(user_id))
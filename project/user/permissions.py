@@ -0,0 +1,12 @@
+from rest_framework import permissions
+
+
+class CanViewUsers(permissions.BasePermission):
+    """
+    Allow authenticated users holding the user.view_customuser permission,
+    such as the service accounts of internal services.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated
+                    and request.user.has_perm('user.view_customuser'))
@@ -0,0 +1,106 @@
+import logging
+import queue
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+
+from .conf import get_setting
+
+
+logger = logging.getLogger(__name__)
+
+_rehasher = None
+_rehasher_lock = threading.Lock()
+
+
+def rehash(user_id, raw_password, encoded):
+    """
+    Store a fresh hash of raw_password for a user, unless the password was
+    changed since encoded was read.
+    """
+    get_user_model()._default_manager.filter(
+        pk=user_id, password=encoded
+    ).update(password=make_password(raw_password))
+
+
+class Rehasher:
+    """
+    Background thread upgrading the password hashes found outdated at login.
+
+    Logins only queue the rehash, so the response does not wait for a second
+    key derivation and an UPDATE. The queue is bounded; when it is full the
+    rehash is dropped and simply happens again at the next login.
+    """
+
+    def __init__(self, max_pending):
+        self.done = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, raw_password, encoded):
+        """Queue the rehash of a user's password"""
+        with self._lock:
+            # Threads do not survive a fork, start one in every process
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='rehash', daemon=True
+                )
+                self._thread.start()
+        try:
+            self._queue.put_nowait((user_id, raw_password, encoded))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                rehash(*job)
+            except Exception:
+                logger.exception('Could not rehash the password of user %s',
+                                 job[0])
+            else:
+                with self._lock:
+                    self.done += 1
+            finally:
+                self._queue.task_done()
+                if self._queue.empty():
+                    connections.close_all()
+
+    def join(self):
+        """Wait until every queued rehash is done"""
+        self._queue.join()
+
+    def stats(self):
+        """Return the done, dropped and pending rehash counters"""
+        with self._lock:
+            return {
+                'done': self.done,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize(),
+            }
+
+
+def get_rehasher():
+    """Return the process wide rehasher"""
+    global _rehasher
+
+    with _rehasher_lock:
+        if _rehasher is None:
+            _rehasher = Rehasher(
+                get_setting('PASSWORD_HASHING', 'MAX_PENDING_REHASHES')
+            )
+        return _rehasher
+
+
+def rehash_metrics():
+    """Return the rehash counters as metrics"""
+    return {
+        f'rehash_{name}': value
+        for name, value in get_rehasher().stats().items()
+    }
@@ -0,0 +1,74 @@
+import gzip
+
+from django.utils.cache import patch_vary_headers
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer producing the same bytes as the default one.
+
+    Compact responses are encoded with a single encoder instance built once
+    instead of per request, and bodies of at least compress_min_size bytes
+    are compressed with brotli (when installed) or gzip if the client
+    accepts it.
+    """
+    compress_min_size = 1024
+
+    _encoder = None
+
+    @classmethod
+    def get_encoder(cls):
+        """Return the shared encoder for compact responses"""
+        if cls._encoder is None:
+            cls._encoder = cls.encoder_class(
+                ensure_ascii=cls.ensure_ascii,
+                allow_nan=not cls.strict,
+                separators=SHORT_SEPARATORS if cls.compact
+                else LONG_SEPARATORS,
+            )
+        return cls._encoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes, compressing large bodies"""
+        renderer_context = renderer_context or {}
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context) is None:
+            ret = self.get_encoder().encode(data)
+            ret = ret.replace('\u2028', '\\u2028') \
+                .replace('\u2029', '\\u2029').encode()
+        else:
+            ret = super().render(data, accepted_media_type, renderer_context)
+
+        response = renderer_context.get('response')
+        request = renderer_context.get('request')
+        if len(ret) >= self.compress_min_size and response is not None \
+                and request is not None:
+            ret = self.compress(ret, request, response)
+        return ret
+
+    def compress(self, content, request, response):
+        """Compress content with an encoding accepted by the client"""
+        accepted = {
+            encoding.split(';')[0].strip()
+            for encoding in request.META.get(
+                'HTTP_ACCEPT_ENCODING', ''
+            ).split(',')
+        }
+        patch_vary_headers(response, ['Accept-Encoding'])
+
+        if brotli is not None and 'br' in accepted:
+            response['Content-Encoding'] = 'br'
+            return brotli.compress(content)
+        if 'gzip' in accepted:
+            response['Content-Encoding'] = 'gzip'
+            return gzip.compress(content, mtime=0)
+        return content
@@ -0,0 +1,316 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.settings import api_settings
+
+from .conf import get_setting
+from .shared_memory import LockTimeout, SharedMap
+
+
+# Current generation, time of the last snapshot written to disk and whether
+# the map changed since that snapshot was taken
+HEADER = struct.Struct('=QdQ')
+# Start of a generation, latest expiry stored in it and number of entries
+GENERATION = struct.Struct('=ddQ')
+# Digest of a jti and its expiry, an expiry of 0 marks a free slot
+ENTRY = struct.Struct('=8sd')
+# Bloom filter bits per entry and hash functions, about 1% false positives
+BLOOM_BITS = 10
+BLOOM_HASHES = 7
+# Share of the slots a generation fills before refusing new entries
+MAX_LOAD = 0.8
+# Refreshes fail rather than stalling every worker behind a process
+# holding the lock for longer than this
+LOCK_TIMEOUT = 0.1
+# Bytes of the map copied per lock acquisition when taking a snapshot
+PERSIST_CHUNK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+_revocations = None
+_revocations_lock = threading.Lock()
+
+
+class RevocationListFull(APIException):
+    """
+    Raised when a refresh token cannot be revoked because the revocation
+    list has no room left.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please try again later.'
+    default_code = 'revocation_list_full'
+
+
+class RevocationListBusy(APIException):
+    """
+    Raised when the revocation list stayed locked for too long. Refreshes
+    fail closed, a token that may have been revoked is never accepted.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, please try again later.'
+    default_code = 'revocation_list_busy'
+
+
+class RevocationList:
+    """
+    Set of revoked token ids in a shared memory map.
+
+    Like the throttling buckets, the map and its lock are inherited by the
+    processes forked after creation, see user/shared_memory.py, so every
+    worker sees a revocation as soon as it is made. Each entry lives in a
+    bloom filter, which answers most lookups of tokens that were never
+    revoked, and in an exact open addressing table that settles the rest.
+
+    Entries are split in two generations that each take new entries for one
+    refresh token lifetime. Once every entry of the older generation has
+    expired it is cleared in one go and reused, so expired revocations are
+    pruned without ever walking the table.
+
+    With a path the whole map is written there by one of the processes at
+    most every persist_interval seconds, when it changed since the last
+    snapshot, and read back at startup. The snapshot is copied a chunk at a
+    time so revocations are not held up by it.
+    """
+
+    def __init__(self, capacity, lifetime, path=None, persist_interval=60):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.path = path
+        self.persist_interval = persist_interval
+        self.slots = int(capacity / MAX_LOAD) + 1
+        self.bloom_bits = capacity * BLOOM_BITS
+        self._bloom_size = (self.bloom_bits + 7) // 8
+        self._generation_size = self._bloom_size + self.slots * ENTRY.size
+        self._offset = HEADER.size + 2 * GENERATION.size
+        self._shared = SharedMap(self._offset + 2 * self._generation_size)
+        self._map = self._shared.map
+        self._persister = None
+        self._persister_pid = None
+        if path:
+            self.load()
+
+    def _hashes(self, jti):
+        digest = hashlib.blake2b(str(jti).encode(), digest_size=16).digest()
+        return (digest[:8], int.from_bytes(digest[:8], 'little'),
+                int.from_bytes(digest[8:], 'little') | 1)
+
+    def _generation(self, index):
+        return GENERATION.unpack_from(self._map,
+                                      HEADER.size + index * GENERATION.size)
+
+    def _set_generation(self, index, started, max_exp, count):
+        GENERATION.pack_into(self._map, HEADER.size + index * GENERATION.size,
+                             started, max_exp, count)
+
+    def _in_bloom(self, base, first, second):
+        for i in range(BLOOM_HASHES):
+            bit = (first + i * second) % self.bloom_bits
+            if not self._map[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _find(self, index, digest, first, second, now):
+        """Return whether a live entry for digest is in a generation"""
+        base = self._offset + index * self._generation_size
+        if not self._in_bloom(base, first, second):
+            return False
+        table = base + self._bloom_size
+        slot = second % self.slots
+        while True:
+            found, exp = ENTRY.unpack_from(self._map,
+                                           table + slot * ENTRY.size)
+            if exp == 0:
+                return False
+            if found == digest:
+                return exp > now
+            slot = (slot + 1) % self.slots
+
+    def _rotate(self, now):
+        """Switch to the other generation once it only holds expired ids"""
+        current = HEADER.unpack_from(self._map, 0)[0]
+        started = self._generation(current)[0]
+        if now < started + self.lifetime:
+            return current
+
+        other = 1 - current
+        if self._generation(other)[1] > now:
+            return current
+        base = self._offset + other * self._generation_size
+        self._map[base:base + self._generation_size] = \
+            bytes(self._generation_size)
+        self._set_generation(other, now, 0.0, 0)
+        _, persisted, changed = HEADER.unpack_from(self._map, 0)
+        HEADER.pack_into(self._map, 0, other, persisted, changed)
+        return other
+
+    def _set_changed(self, changed):
+        current, persisted, _ = HEADER.unpack_from(self._map, 0)
+        HEADER.pack_into(self._map, 0, current, persisted, changed)
+
+    @contextmanager
+    def _locked(self):
+        try:
+            with self._shared.lock(LOCK_TIMEOUT):
+                yield
+        except LockTimeout:
+            raise RevocationListBusy()
+
+    def __contains__(self, jti):
+        digest, first, second = self._hashes(jti)
+        now = time.time()
+        self._start_persister()
+        with self._locked():
+            return any(self._find(index, digest, first, second, now)
+                       for index in (0, 1))
+
+    def add(self, jti, exp):
+        """
+        Revoke a token id until exp, a UNIX timestamp. Return False when it
+        was already revoked, which makes revoking and checking one atomic
+        step for concurrent refreshes of the same token.
+        """
+        digest, first, second = self._hashes(jti)
+        now = time.time()
+        self._start_persister()
+        with self._locked():
+            if any(self._find(index, digest, first, second, now)
+                   for index in (0, 1)):
+                return False
+
+            current = self._rotate(now)
+            started, max_exp, count = self._generation(current)
+            if count >= self.capacity:
+                raise RevocationListFull()
+
+            base = self._offset + current * self._generation_size
+            for i in range(BLOOM_HASHES):
+                bit = (first + i * second) % self.bloom_bits
+                self._map[base + (bit >> 3)] |= 1 << (bit & 7)
+            table = base + self._bloom_size
+            slot = second % self.slots
+            while ENTRY.unpack_from(self._map, table + slot * ENTRY.size)[1]:
+                slot = (slot + 1) % self.slots
+            ENTRY.pack_into(self._map, table + slot * ENTRY.size, digest,
+                            float(exp))
+            self._set_generation(current, started, max(max_exp, exp),
+                                 count + 1)
+            self._set_changed(True)
+            return True
+
+    def stats(self):
+        """
+        Return the number of entries and the capacity per generation, raise
+        LockTimeout when the list stays locked
+        """
+        with self._shared.lock(LOCK_TIMEOUT):
+            entries = sum(self._generation(index)[2] for index in (0, 1))
+        return {'entries': entries, 'capacity': self.capacity}
+
+    def clear(self):
+        """Drop every revocation"""
+        with self._shared.lock(LOCK_TIMEOUT):
+            self._map[:] = bytes(len(self._map))
+            self._set_changed(True)
+
+    def load(self):
+        """Read the snapshot at path when it matches the current layout"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if len(data) == len(self._map):
+            with self._shared.lock(LOCK_TIMEOUT):
+                self._map[:] = data
+                self._set_changed(False)
+
+    def persist(self, force=False):
+        """
+        Write a snapshot to path, unless nothing changed since the last one
+        or another process wrote one less than persist_interval seconds ago.
+        """
+        now = time.time()
+        with self._shared.lock(LOCK_TIMEOUT):
+            current, persisted, changed = HEADER.unpack_from(self._map, 0)
+            if not force and (not changed
+                              or now < persisted + self.persist_interval):
+                return False
+            # A revocation made during the copy marks the map changed again
+            # and, if it missed this snapshot, is in the next one
+            HEADER.pack_into(self._map, 0, current, now, False)
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                for start in range(0, len(self._map), PERSIST_CHUNK):
+                    with self._shared.lock(LOCK_TIMEOUT):
+                        chunk = self._map[start:start + PERSIST_CHUNK]
+                    f.write(chunk)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            with self._shared.lock(LOCK_TIMEOUT):
+                self._set_changed(True)
+            raise
+        return True
+
+    def _start_persister(self):
+        # Threads do not survive a fork, start one in every process
+        if not self.path or self._persister_pid == os.getpid():
+            return
+        self._persister_pid = os.getpid()
+        self._persister = threading.Thread(
+            target=self._persist_forever, name='revocation-persister',
+            daemon=True,
+        )
+        self._persister.start()
+
+    def _persist_forever(self):
+        while True:
+            time.sleep(self.persist_interval)
+            try:
+                self.persist()
+            except Exception:
+                logger.exception('Could not persist the revocation list')
+
+
+def get_revocations():
+    """
+    Return the shared revocation list, creating it on first use.
+
+    UserConfig.ready creates it so a preloaded master holds it before the
+    workers fork.
+    """
+    global _revocations
+
+    with _revocations_lock:
+        if _revocations is None:
+            lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+            capacity = get_setting('REVOCATION', 'CAPACITY') or math.ceil(
+                get_setting('REVOCATION', 'RATE') * lifetime
+            )
+            _revocations = RevocationList(
+                capacity=capacity,
+                lifetime=lifetime,
+                path=get_setting('REVOCATION', 'PATH'),
+                persist_interval=get_setting('REVOCATION',
+                                             'PERSIST_INTERVAL'),
+            )
+        return _revocations
+
+
+def revocation_metrics():
+    """Return the size of the revocation list as metrics"""
+    try:
+        stats = get_revocations().stats()
+    except LockTimeout:
+        return {}
+    return {f'revoked_tokens_{name}': value for name, value in stats.items()}
@@ -1,51 +1,224 @@
-import re
+from operator import attrgetter
 
-from django.contrib.auth import get_user_model
+from django.contrib.auth import get_user_model, password_validation
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from .last_login import get_last_login_recorder
+from .permission_bits import add_permission_claim
+from .revocation import get_revocations
+from .stateless import add_profile_claims, is_current
+from .tokens import PASSWORD_CLAIM, get_verified_token
 
 
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer for the CustomUser object.
+
+    Email uniqueness is not checked with a query up front, it is left to the
+    case-insensitive unique constraint and conflicts are reported as
+    validation errors, so creating a user is a single INSERT and updating
+    one a single UPDATE of the fields that changed. Changing the password
+    takes the current one.
     """
+    current_password = serializers.CharField(
+        write_only=True, required=False, trim_whitespace=False,
+        style={'input_type': 'password'},
+    )
 
     class Meta:
         model = get_user_model()
-        fields = ['email', 'password', 'name']
-        extra_kwargs = {'password': {'write_only': True, 'min_length': 8}}
+        fields = ['email', 'password', 'name', 'current_password']
+        extra_kwargs = {
+            'password': {'write_only': True, 'min_length': 8},
+            'email': {'validators': []},
+        }
 
     def create(self, validated_data):
         """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        try:
+            with transaction.atomic():
+                return get_user_model().objects.create_user(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'email': [self.unique_email_message()]}
+            )
+
+    @staticmethod
+    def unique_email_message():
+        """Return the message UniqueValidator would give for the email"""
+        field = get_user_model()._meta.get_field('email')
+        return field.error_messages['unique'] % {
+            'model_name': field.model._meta.verbose_name,
+            'field_label': field.verbose_name,
+        }
 
     def update(self, instance, validated_data):
-        """Update an existing user and return it"""
+        """Update the changed fields of a user with one UPDATE and return it"""
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        if 'email' in validated_data:
+            validated_data['email'] = get_user_model().objects \
+                .normalize_email(validated_data['email'])
 
+        update_fields = []
+        for field, value in validated_data.items():
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                update_fields.append(field)
         if password:
-            user.set_password(password)
-            user.save()
+            instance.change_password(password)
+            update_fields += ['password', 'password_epoch']
 
-        return user
+        if update_fields:
+            try:
+                with transaction.atomic():
+                    instance.save(update_fields=update_fields)
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    {'email': [self.unique_email_message()]}
+                )
+        return instance
 
-    def validate_password(self, password):
-        """Validate the password is formated correctly and return it"""
-        if len(password) <= 8:
+    def validate(self, attrs):
+        """Check the current password of a user changing it"""
+        current_password = attrs.pop('current_password', None)
+        if self.instance is None or 'password' not in attrs:
+            return attrs
+        if not current_password:
             raise serializers.ValidationError(
-                "Password must be longer than 8 characters"
+                {'current_password': ['This field is required.']}
             )
-
-        if re.search(r'\s', password):
+        if not self.instance.check_password(current_password):
             raise serializers.ValidationError(
-                "Password cannot contain whitespace characters"
+                {'current_password': ['Your current password is incorrect.']}
             )
+        return attrs
 
-        if not bool(re.search(r'[0-9]', password) and
-                    re.search(r'[a-zA-Z]', password)):
-            raise serializers.ValidationError(
-                "Password must contain one letter character "
-                "and one number character"
+    def validate_password(self, password):
+        """Validate the password against AUTH_PASSWORD_VALIDATORS"""
+        user = self.instance
+        if user is None and isinstance(self.initial_data, dict):
+            user = get_user_model()(
+                email=self.initial_data.get('email', ''),
+                name=self.initial_data.get('name', ''),
             )
 
+        try:
+            password_validation.validate_password(password, user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(list(e.messages))
+
         return password
+
+
+class UserReadSerializer:
+    """
+    Read-only serializer for user responses.
+
+    Produces the same data as UserSerializer through a precompiled getter
+    over a fixed list of fields, without binding a ModelSerializer and its
+    fields for every object.
+    """
+    fields = ('email', 'name')
+    _get_fields = attrgetter(*fields)
+
+    def __init__(self, instance=None, many=False):
+        self.instance = instance
+        self.many = many
+
+    def to_representation(self, instance):
+        return dict(zip(self.fields, self._get_fields(instance)))
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(item) for item in self.instance]
+        return self.to_representation(self.instance)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    Token pair issue that leaves the last_login write to the recorder.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[PASSWORD_CLAIM] = user.password_epoch
+        add_permission_claim(token, user.pk)
+        add_profile_claims(token, user.pk)
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        get_last_login_recorder().record(self.user.pk, timezone.now())
+        return data
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    """
+    Token verification backed by the verified token cache.
+    """
+
+    def validate(self, attrs):
+        token = get_verified_token(UntypedToken, attrs['token'])
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti is not None and jti in get_revocations():
+            raise serializers.ValidationError('Token is revoked')
+        return {}
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Token refresh with rotation checked against the shared revocation list.
+
+    The refreshed token is revoked in the same step that checks it, so a
+    refresh token can be exchanged once and replaying it fails. Changing
+    the password revokes the refresh tokens issued before the change.
+    """
+
+    @staticmethod
+    def check_password_claim(refresh, user_id):
+        """Refuse a token issued under a password the user has changed"""
+        epoch = get_user_model()._default_manager.using(DEFAULT_DB_ALIAS) \
+            .filter(pk=user_id, is_active=True) \
+            .values_list('password_epoch', flat=True).first()
+        if epoch is None:
+            raise TokenError('User not found')
+        # Tokens issued before the claim existed carry it from now on
+        if refresh.get(PASSWORD_CLAIM, epoch) != epoch:
+            raise TokenError('Token is revoked')
+        refresh[PASSWORD_CLAIM] = epoch
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if not get_revocations().add(jti, refresh['exp']):
+                raise TokenError('Token is revoked')
+        elif jti in get_revocations():
+            raise TokenError('Token is revoked')
+
+        # Password, permissions and profile may have changed since the token
+        # was issued
+        user_id = refresh[api_settings.USER_ID_CLAIM]
+        self.check_password_claim(refresh, user_id)
+        add_permission_claim(refresh, user_id)
+        if 'ver' in refresh and not is_current(refresh) \
+                and not add_profile_claims(refresh, user_id):
+            raise TokenError('User not found')
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
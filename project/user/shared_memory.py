@@ -0,0 +1,71 @@
+import fcntl
+import mmap
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+
+# Pause between two attempts at a lock held by another process
+LOCK_POLL_INTERVAL = 0.0002
+
+_maps = weakref.WeakSet()
+
+
+class LockTimeout(Exception):
+    """
+    Raised when a shared map could not be locked within the timeout.
+    """
+
+
+class SharedMap:
+    """
+    Memory map shared with every process forked after its creation.
+
+    The map is backed by an unlinked temporary file so it can be locked
+    with fcntl. The kernel drops such a lock when the process holding it
+    dies, so a worker killed in the middle of an update cannot leave the
+    others waiting forever. fcntl locks belong to a process, a thread lock
+    taken first keeps the threads of one process out of each other's way.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._file = tempfile.TemporaryFile()
+        self._file.truncate(size)
+        self.map = mmap.mmap(self._file.fileno(), size)
+        self._thread_lock = threading.Lock()
+        _maps.add(self)
+
+    @contextmanager
+    def lock(self, timeout):
+        """Hold the lock of the map, raise LockTimeout after timeout"""
+        deadline = time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=timeout):
+            raise LockTimeout()
+        try:
+            while True:
+                try:
+                    fcntl.lockf(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise LockTimeout()
+                    time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                yield self.map
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+def _reset_thread_locks():
+    # A thread of the parent may have held a lock when it forked
+    for shared in _maps:
+        shared._thread_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_thread_locks)
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_permissions_version, bump_user_version, \
+    invalidate_user_permissions
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """Invalidate the cached version of a user when its row changes"""
+    bump_user_version(instance.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Invalidate the permission bits of the users whose groups changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        invalidate_user_permissions(*pk_set)
+    else:
+        # A group or permission was cleared of all its users
+        bump_permissions_version()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def permissions_changed(sender, **kwargs):
+    """Invalidate the permission bits of every user"""
+    if kwargs.get('action', 'post').startswith('post'):
+        bump_permissions_version()
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .backends import PermissionBitsBackend
+from .cache import get_user_version
+from .conf import get_setting
+from .permission_bits import decode_bits
+
+
+# Claims copied from the user into tokens issued in stateless mode
+PROFILE_CLAIMS = ('email', 'name', 'is_staff', 'is_superuser')
+
+
+class StatelessUser(TokenUser):
+    """
+    User built from the claims of a token instead of a database row.
+
+    Only served while the version claim of the token matches the current
+    version of the user, see is_current, so the profile claims are as fresh
+    as the row. Permission checks go through PermissionBitsBackend, using
+    the bits of the token when it carries them.
+    """
+    _backend = PermissionBitsBackend()
+
+    def __str__(self):
+        return self.email
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def name(self):
+        return self.token.get('name', '')
+
+    @cached_property
+    def permission_bits(self):
+        if get_setting('PERMISSIONS', 'IN_TOKEN') and 'perms' in self.token:
+            return decode_bits(self.token['perms'])
+        return None
+
+    def get_username(self):
+        return self.email
+
+    def get_all_permissions(self, obj=None):
+        return self._backend.get_all_permissions(self, obj)
+
+    def has_perm(self, perm, obj=None):
+        return self._backend.has_perm(self, perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, module):
+        return self._backend.has_module_perms(self, module)
+
+
+def add_profile_claims(token, user_id):
+    """
+    Copy the profile of a user and its current version into a token when
+    STATELESS_AUTH['ENABLED'] is on. Return False when the user does not
+    exist or is inactive.
+
+    The version is read before the row, from the primary. A change landing
+    in between leaves the token a version behind its profile, which only
+    costs a database read, never a stale profile passing as current.
+    """
+    if not get_setting('STATELESS_AUTH', 'ENABLED'):
+        return True
+    version = get_user_version(user_id)
+    profile = get_user_model()._default_manager.using(DEFAULT_DB_ALIAS) \
+        .filter(pk=user_id, is_active=True).values(*PROFILE_CLAIMS).first()
+    if profile is None:
+        return False
+    for claim in PROFILE_CLAIMS:
+        token[claim] = profile[claim]
+    token['ver'] = version
+    return True
+
+
+def is_current(token):
+    """Return whether the profile claims of a token are still current"""
+    return 'ver' in token and token['ver'] == get_user_version(
+        token[api_settings.USER_ID_CLAIM]
+    )
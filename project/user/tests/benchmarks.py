@@ -0,0 +1,326 @@
+"""
+Benchmark suite for the user and authentication endpoints.
+
+Drives every endpoint of user/urls.py through the Django test client at a
+configurable concurrency against a throwaway test database and reports
+throughput, latency percentiles, SQL queries and hashing time per request.
+
+Run it from the project directory:
+
+    python -m user.tests.benchmarks --requests 200 --concurrency 8
+    python -m user.tests.benchmarks --json baseline.json
+    python -m user.tests.benchmarks --compare baseline.json
+
+With --compare the exit status is 1 when any endpoint regressed by more
+than --threshold percent, so it can gate a CI job.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+
+# Metrics where a higher value is better, every other one is a cost
+HIGHER_IS_BETTER = {'throughput'}
+COMPARED_METRICS = (
+    'throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'queries', 'hashing_ms',
+)
+
+PASSWORD = 'benchpass123'
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1,
+                      int(round(percent / 100 * len(values))) - 1))
+    return values[rank]
+
+
+def hash_time(response):
+    """Return the hashing time reported in the Server-Timing header"""
+    for entry in response.get('Server-Timing', '').split(','):
+        phase, _, params = entry.strip().partition(';')
+        if phase == 'hash':
+            return float(params.split(';')[0][len('dur='):]) / 1000
+    return 0.0
+
+
+class Context:
+    """
+    Fixtures shared by the scenarios: a user, its tokens, a service account
+    allowed to resolve users and a counter for unique registration emails.
+    """
+
+    def __init__(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.models import Permission
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.user = get_user_model().objects.create_user(
+            email='bench@email.com', name='Bench User', password=PASSWORD,
+        )
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        service = get_user_model().objects.create_user(
+            email='service@email.com', name='Service', password=PASSWORD,
+        )
+        service.user_permissions.add(
+            Permission.objects.get(codename='view_customuser')
+        )
+        self.service_access = str(RefreshToken.for_user(service).access_token)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def new_refresh(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        return str(RefreshToken.for_user(self.user))
+
+    def next_email(self):
+        with self._lock:
+            return f'load{next(self._counter)}@example.com'
+
+
+def register(client, ctx):
+    return client.post('/api/user/register/', {
+        'email': ctx.next_email(), 'name': 'Bench', 'password': PASSWORD,
+    })
+
+
+def token(client, ctx):
+    return client.post('/api/user/token/', {
+        'email': ctx.user.email, 'password': PASSWORD,
+    })
+
+
+def token_refresh(client, ctx):
+    # Refresh tokens are rotated, every client follows its own chain
+    refresh = getattr(client, 'refresh_token', None) or ctx.new_refresh()
+    response = client.post('/api/user/token/refresh/', {'refresh': refresh})
+    client.refresh_token = response.data.get('refresh')
+    return response
+
+
+def token_verify(client, ctx):
+    return client.post('/api/user/token/verify/', {'token': ctx.access})
+
+
+def aboutme(client, ctx):
+    return client.get('/api/user/aboutme/',
+                      HTTP_AUTHORIZATION=f'Bearer {ctx.access}')
+
+
+def resolve(client, ctx):
+    # A page of 500 ids, those after the fixture user were registered by the
+    # register scenario
+    ids = ','.join(str(ctx.user.pk + i) for i in range(500))
+    response = client.get('/api/user/resolve/', {'ids': ids},
+                          HTTP_AUTHORIZATION=f'Bearer {ctx.service_access}')
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+SCENARIOS = {
+    'register': register,
+    'token': token,
+    'token_refresh': token_refresh,
+    'token_verify': token_verify,
+    'aboutme': aboutme,
+    'resolve': resolve,
+}
+
+
+def run_scenario(scenario, ctx, requests, concurrency):
+    """Run one scenario and return its measurements"""
+    from django.db import connection, connections
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    samples_lock = threading.Lock()
+    shares = [requests // concurrency + (i < requests % concurrency)
+              for i in range(concurrency)]
+
+    def worker(count):
+        client = Client()
+        local = []
+        try:
+            for _ in range(count):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = scenario(client, ctx)
+                    elapsed = time.perf_counter() - start
+                local.append((elapsed, len(queries), hash_time(response),
+                              response.status_code < 400))
+        finally:
+            connections.close_all()
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(share,))
+               for share in shares if share]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    count = len(samples) or 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample[3]),
+        'throughput': len(samples) / wall,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'queries': sum(sample[1] for sample in samples) / count,
+        'hashing_ms': sum(sample[2] for sample in samples) * 1000 / count,
+    }
+
+
+def measure_serialization(ctx, rounds):
+    """
+    Return the time per object, in microseconds, to serialize and render a
+    user with UserSerializer and the default renderer and with the read
+    path serializer and renderer.
+    """
+    from rest_framework.renderers import JSONRenderer
+    from user.renderers import FastJSONRenderer
+    from user.serializers import UserReadSerializer, UserSerializer
+
+    def timed(serialize):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            serialize()
+        return (time.perf_counter() - start) / rounds * 1e6
+
+    return {
+        'model_serializer_us': timed(lambda: JSONRenderer().render(
+            UserSerializer(ctx.user).data)),
+        'read_serializer_us': timed(lambda: FastJSONRenderer().render(
+            UserReadSerializer(ctx.user).data)),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every metric against a baseline and return the
+    list of regressions larger than threshold percent.
+    """
+    regressions = []
+    print(f"\n{'endpoint':<15}{'metric':<12}{'baseline':>12}"
+          f"{'current':>12}{'change':>10}")
+    for name, metrics in results.items():
+        if name not in SCENARIOS or name not in baseline:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = baseline[name][metric], metrics[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append((name, metric, change))
+            print(f'{name:<15}{metric:<12}{old:>12.2f}{new:>12.2f}'
+                  f'{change:>+9.1f}%{flag}')
+    return regressions
+
+
+def print_results(results):
+    print(f"{'endpoint':<15}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'queries':>9}{'hash ms':>9}{'errors':>8}")
+    for name, r in results.items():
+        if name not in SCENARIOS:
+            continue
+        print(f"{name:<15}{r['throughput']:>9.1f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['queries']:>9.2f}"
+              f"{r['hashing_ms']:>9.2f}{r['errors']:>8}")
+
+    if 'serialization' in results:
+        print('\nuser serialization per object: {model_serializer_us:.1f}us '
+              'with UserSerializer, {read_serializer_us:.1f}us with '
+              'UserReadSerializer'.format(**results['serialization']))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1],
+                                     prog='python -m user.tests.benchmarks')
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Requests per endpoint.')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Concurrent clients per endpoint.')
+    parser.add_argument('--endpoint', action='append',
+                        choices=sorted(SCENARIOS),
+                        help='Endpoint to run, repeat for several. '
+                             'Defaults to all of them.')
+    parser.add_argument('--serialization-rounds', type=int, default=10000,
+                        help='Objects serialized to time serialization, '
+                             '0 to skip it.')
+    parser.add_argument('--json', metavar='PATH',
+                        help='Write the results as JSON to PATH.')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='Compare against results saved with --json.')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Regression threshold in percent.')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='Reuse the test database between runs.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'designh.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import override_settings, \
+        setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    # Every scenario runs from one address, measure the endpoints and not
+    # the throttles in front of them
+    unthrottled = override_settings(THROTTLING={'RATES': {}})
+    unthrottled.enable()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb)
+    try:
+        ctx = Context()
+        results = {}
+        for name in args.endpoint or SCENARIOS:
+            results[name] = run_scenario(SCENARIOS[name], ctx,
+                                         args.requests, args.concurrency)
+        if args.serialization_rounds:
+            results['serialization'] = measure_serialization(
+                ctx, args.serialization_rounds
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0,
+                                            keepdb=args.keepdb)
+        unthrottled.disable()
+        teardown_test_environment()
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from user.admin import EstimatedCountPaginator
+
+
+CHANGELIST_URL = reverse('admin:user_customuser_changelist')
+
+
+class CustomUserAdminTest(TestCase):
+    """
+    Test the admin changelist of the custom user model.
+    """
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email='admin@email.com', password='testpass123'
+        )
+        self.client.force_login(self.admin)
+
+    def create_users(self, count, start=0):
+        group = Group.objects.create(name=f'group{start}')
+        permission = Permission.objects.first()
+        for i in range(start, start + count):
+            user = get_user_model().objects.create_user(
+                email=f'user{i}@email.com', name=f'User {i}',
+                password='testpass123',
+            )
+            user.groups.add(group)
+            user.user_permissions.add(permission)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that the changelist query count is independent of the page"""
+        self.create_users(3)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(CHANGELIST_URL)
+        self.assertEqual(response.status_code, 200)
+
+        self.create_users(10, start=3)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(CHANGELIST_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few), len(many))
+
+    def test_changelist_search(self):
+        """Test that searching matches email and name case-insensitively"""
+        self.create_users(3)
+        response = self.client.get(CHANGELIST_URL, {'q': 'USER 1'})
+
+        self.assertContains(response, 'user1@email.com')
+        self.assertNotContains(response, 'user2@email.com')
+
+    def test_paginator_caps_page_count(self):
+        """Test that the paginator never offers pages past max_pages"""
+        self.create_users(5)
+        paginator = EstimatedCountPaginator(
+            get_user_model().objects.order_by('-id'), 1
+        )
+        paginator.max_pages = 2
+
+        self.assertEqual(paginator.count, 6)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(list(paginator.page_range), [1, 2])
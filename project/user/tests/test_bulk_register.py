@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+
+
+REGISTER_BULK_URL = reverse('user:register_bulk')
+
+
+class BulkCreateUsersTest(APITestCase):
+    """
+    Test the bulk creation of users through the manager.
+    """
+
+    def test_bulk_create_users_success(self):
+        """Test that every valid row is created with a hashed password"""
+        rows = [
+            {'email': f'user{i}@EMAIL.com', 'name': f'User {i}',
+             'password': f'testpass{i}00'}
+            for i in range(5)
+        ]
+        created, errors = get_user_model().objects.bulk_create_users(
+            rows, batch_size=2
+        )
+
+        self.assertEqual(errors, {})
+        self.assertEqual(len(created), 5)
+        for i in range(5):
+            user = get_user_model().objects.get(email=f'user{i}@email.com')
+            self.assertTrue(user.check_password(f'testpass{i}00'))
+
+    def test_bulk_create_users_reports_duplicates(self):
+        """Test that duplicate emails are reported without failing the batch"""
+        get_user_model().objects.create_user(
+            email='taken@email.com', password='testpass123'
+        )
+        rows = [
+            {'email': 'taken@email.com', 'password': 'testpass123'},
+            {'email': 'new@email.com', 'password': 'testpass123'},
+            {'email': 'new@email.com', 'password': 'testpass123'},
+            {'email': '', 'password': 'testpass123'},
+        ]
+        created, errors = get_user_model().objects.bulk_create_users(rows)
+
+        self.assertEqual([user.email for user in created], ['new@email.com'])
+        self.assertEqual(sorted(errors), [0, 2, 3])
+
+    def test_bulk_create_users_rolls_back_on_error(self):
+        """Test that a failing chunk leaves no user of the batch behind"""
+        manager = get_user_model().objects
+        rows = [
+            {'email': f'user{i}@email.com', 'password': f'testpass{i}00'}
+            for i in range(4)
+        ]
+        bulk_create = manager.bulk_create
+        calls = iter([bulk_create, mock.Mock(side_effect=RuntimeError)])
+
+        with mock.patch.object(manager, 'bulk_create',
+                               side_effect=lambda objs: next(calls)(objs)):
+            with self.assertRaises(RuntimeError):
+                manager.bulk_create_users(rows, batch_size=2)
+
+        self.assertFalse(manager.filter(email__startswith='user').exists())
+
+
+class BulkRegisterViewTest(APITestCase):
+    """
+    Test the bulk registration endpoint.
+    """
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email='admin@email.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_register_partial_success(self):
+        """Test that invalid rows are reported by index"""
+        payload = [
+            {'email': 'one@email.com', 'name': 'One', 'password': 'testpass1'},
+            {'email': 'two@email.com', 'name': 'Two', 'password': 'short'},
+            {'email': 'admin@email.com', 'name': 'A', 'password': 'testpass1'},
+        ]
+        response = self.client.post(REGISTER_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], [
+            {'email': 'one@email.com', 'name': 'One'}
+        ])
+        self.assertEqual(
+            [error['index'] for error in response.data['errors']], [1, 2]
+        )
+
+    def test_bulk_register_requires_admin(self):
+        """Test that regular users cannot register users in bulk"""
+        self.client.force_authenticate(None)
+        response = self.client.post(REGISTER_BULK_URL, [], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
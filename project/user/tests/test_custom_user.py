@@ -1,9 +1,15 @@
+from unittest import mock
+
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient, APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 
+from user.cache import get_user_version
+
 
 REGISTER_USER_URL = reverse('user:register')
 ABOUT_USER_URL = reverse('user:aboutme')
@@ -206,3 +212,206 @@ class PrivateUserTest(APITestCase):
             'email': self.user.email,
             'name': self.user.name
         })
+
+    def test_user_me_not_modified(self):
+        """
+        Test that aboutme answers a matching If-None-Match with an empty 304
+        until the user changes
+        """
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        response = self.client.get(ABOUT_USER_URL)
+        etag = response['ETag']
+
+        response = self.client.get(ABOUT_USER_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        # Any change to the user row invalidates the ETag
+        self.user.name = 'Test Jameson'
+        self.user.save()
+
+        response = self.client.get(ABOUT_USER_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['name'], 'Test Jameson')
+
+    def test_user_me_etag_not_ahead_of_body(self):
+        """
+        Test that a change landing between authentication and the ETag is
+        in the body served under that ETag
+        """
+        def change_then_get_version(user_id):
+            self.user.name = 'Test Jameson'
+            self.user.save()
+            return get_user_version(user_id)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        with mock.patch('user.views.get_user_version',
+                        side_effect=change_then_get_version):
+            response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.data['name'], 'Test Jameson')
+        self.assertEqual(response['ETag'],
+                         f'"{self.user.pk}-{get_user_version(self.user.pk)}"')
+
+
+class CaseInsensitiveEmailTest(APITestCase):
+    """
+    Test that emails are unique and looked up regardless of their case.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {
+            'email': 'Test@Email.com',
+            'name': 'John Doe',
+            'password': 'testpass123'
+        }
+        self.client.post(REGISTER_USER_URL, self.payload)
+
+    def test_register_is_single_insert(self):
+        """Test that registering runs no uniqueness SELECT"""
+        payload = dict(self.payload, email='other@email.com')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(REGISTER_USER_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertNotIn('SELECT', statements)
+        self.assertEqual(statements.count('INSERT'), 1)
+
+    def test_duplicate_email_other_case(self):
+        """Test that an email differing only in case is rejected"""
+        payload = dict(self.payload, email='TEST@email.com')
+        response = self.client.post(REGISTER_USER_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['email'],
+                         ['custom user with this email already exists.'])
+
+    def test_login_email_other_case(self):
+        """Test that a JWT can be obtained with the email in another case"""
+        response = self.client.post(JWT_OBTAIN_URL, data={
+            'email': 'test@EMAIL.COM',
+            'password': self.payload['password']
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+def write_statements(queries):
+    """Return the INSERT and UPDATE statements among captured queries"""
+    return [query['sql'] for query in queries
+            if query['sql'].split()[0] in ('INSERT', 'UPDATE')]
+
+
+class AccountLifecycleTest(APITestCase):
+    """
+    Test that creating and updating an account is a single write.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            name='Test Johnson',
+            password='testpass876'
+        )
+        get_user_model().objects.create_user(
+            email='other@email.com', name='Other', password='testpass876'
+        )
+        access = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_create_superuser_single_insert(self):
+        """Test that creating a superuser does not UPDATE after INSERT"""
+        with CaptureQueriesContext(connection) as queries:
+            user = get_user_model().objects.create_superuser(
+                email='admin@email.com', password='testpass876'
+            )
+
+        writes = write_statements(queries)
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        self.assertTrue(user.is_staff and user.is_superuser)
+
+    def test_patch_name_single_update(self):
+        """Test that a PATCH writes only the changed field"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(ABOUT_USER_URL, {'name': 'New'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'New')
+        writes = write_statements(queries)
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn('"password"', writes[0])
+        self.assertNotIn('"email"', writes[0])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New')
+
+    def test_patch_password_single_update(self):
+        """Test that changing the password is a single UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(ABOUT_USER_URL, {
+                'password': 'newpass9876', 'current_password': 'testpass876',
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('password', response.data)
+        self.assertNotIn('current_password', response.data)
+        self.assertEqual(len(write_statements(queries)), 1)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpass9876'))
+
+    def test_password_change_requires_current_password(self):
+        """Test that the password only changes with the current one"""
+        for payload in ({'password': 'newpass9876'},
+                        {'password': 'newpass9876',
+                         'current_password': 'wrongpass123'}):
+            response = self.client.patch(ABOUT_USER_URL, payload)
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertIn('current_password', response.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('testpass876'))
+
+    def test_put_single_update(self):
+        """Test that a PUT of every field is a single UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(ABOUT_USER_URL, {
+                'email': 'new@email.com',
+                'name': 'New',
+                'password': 'newpass9876',
+                'current_password': 'testpass876',
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(write_statements(queries)), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'new@email.com')
+
+    def test_unchanged_patch_writes_nothing(self):
+        """Test that a PATCH with the current values writes nothing"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(ABOUT_USER_URL,
+                                         {'name': 'Test Johnson'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(write_statements(queries), [])
+
+    def test_patch_taken_email(self):
+        """Test that taking another user's email is a validation error"""
+        response = self.client.patch(ABOUT_USER_URL,
+                                     {'email': 'OTHER@email.com'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+
+    def test_update_requires_authentication(self):
+        """Test that anonymous requests cannot update an account"""
+        self.client.credentials()
+        response = self.client.patch(ABOUT_USER_URL, {'name': 'New'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,169 @@
+import os
+import threading
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from psycopg2 import extensions
+
+from designh.db.pool import ConnectionPool, PoolTimeout
+from designh.db.postgresql_pool import base
+from designh.db.postgresql_pool.base import DatabaseWrapper, close_pools
+
+
+class FakeConnection:
+    """
+    Stand-in for a DB-API connection that only tracks whether it is open.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """
+    Test the connection pool behind the pooled PostgreSQL backend.
+    """
+
+    def test_connections_are_reused(self):
+        """Test that a returned connection is handed out again"""
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        """Test that a checkout waits at most timeout seconds"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_returned_connection(self):
+        """Test that a waiting checkout is woken up by a return"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertGreater(pool.stats()['wait_seconds_max'], 0)
+
+    def test_connection_recycled_after_max_uses(self):
+        """Test that worn out connections are closed and replaced"""
+        pool = ConnectionPool(FakeConnection, max_size=1, max_uses=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        pool.putconn(pool.getconn())
+
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_failed_ping_replaces_connection(self):
+        """Test that a connection failing the pre-ping is not handed out"""
+        def ping(conn):
+            if conn.closed:
+                raise OSError('server closed the connection')
+
+        pool = ConnectionPool(FakeConnection, max_size=1, ping=ping,
+                              ping_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = True
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['failed_pings'], 1)
+        self.assertEqual(pool.stats()['utilization'], 1.0)
+
+    def test_recent_connection_not_pinged(self):
+        """Test that connections idle for less than ping_after are trusted"""
+        ping = mock.Mock()
+        pool = ConnectionPool(FakeConnection, max_size=1, ping=ping,
+                              ping_after=60)
+        pool.putconn(pool.getconn())
+        pool.getconn()
+
+        ping.assert_not_called()
+
+    def test_ping_ends_transaction(self):
+        """Test that the pre-ping does not leave a transaction open"""
+        conn = mock.MagicMock(autocommit=False)
+        base.ping(conn)
+        conn.rollback.assert_called_once_with()
+
+        conn = mock.MagicMock(autocommit=True)
+        base.ping(conn)
+        conn.rollback.assert_not_called()
+
+    def test_close_pools(self):
+        """Test that the pools of the process are emptied before a fork"""
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        with mock.patch.dict(base._pools, {('test', os.getpid(), ''): pool}):
+            close_pools()
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs a PostgreSQL server')
+class PooledBackendTest(TestCase):
+    """
+    Test the pooled PostgreSQL backend against the test database.
+    """
+
+    def wrapper(self, **options):
+        """Return a pooled wrapper of the test database, with options"""
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'OPTIONS': options,
+             'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 1}},
+            alias='pool_test',
+        )
+        self.addCleanup(lambda: wrapper.get_pool().closeall())
+        return wrapper
+
+    def isolation(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW transaction_isolation')
+            return cursor.fetchone()[0]
+
+    def test_connection_shared_across_threads(self):
+        """Test that a connection opened by a thread serves the others"""
+        wrappers = []
+
+        def query():
+            wrapper = self.wrapper()
+            wrappers.append(wrapper)
+            self.isolation(wrapper)
+            wrapper.close()
+
+        for _ in range(2):
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+
+        stats = wrappers[1].get_pool().stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertIs(wrappers[0].get_pool(), wrappers[1].get_pool())
+
+    def test_isolation_level_applied(self):
+        """Test that a pooled connection takes the configured isolation"""
+        wrapper = self.wrapper()
+        self.assertEqual(self.isolation(wrapper), 'read committed')
+        wrapper.close()
+
+        wrapper = self.wrapper(
+            isolation_level=extensions.ISOLATION_LEVEL_SERIALIZABLE
+        )
+        self.assertEqual(self.isolation(wrapper), 'serializable')
+        wrapper.close()
+        self.assertEqual(wrapper.get_pool().stats()['size'], 1)
@@ -0,0 +1,96 @@
+import os
+import time
+from unittest import mock
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+
+from user import hashing
+
+
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+
+
+class HashingExecutorTest(APITestCase):
+    """
+    Test the bounded hashing executor.
+    """
+
+    def test_hashers_run_on_executor(self):
+        """Test that hashing and checking a password use the pool"""
+        with mock.patch.object(hashing.HashingExecutor, 'run',
+                               autospec=True,
+                               side_effect=hashing.HashingExecutor.run) as run:
+            encoded = make_password('testpass123')
+            self.assertTrue(check_password('testpass123', encoded))
+
+        self.assertEqual(run.call_count, 2)
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+
+    def test_pool_sized_per_server_process(self):
+        """Test that the server processes share the CPUs between them"""
+        with mock.patch.object(os, 'cpu_count', return_value=8):
+            with override_settings(
+                    PASSWORD_HASHING={'SERVER_PROCESSES': 4}):
+                self.assertEqual(hashing.default_workers(), 2)
+            with override_settings(
+                    PASSWORD_HASHING={'SERVER_PROCESSES': 16}):
+                self.assertEqual(hashing.default_workers(), 1)
+
+    def test_executor_sheds_load_when_full(self):
+        """Test that jobs beyond the queue depth are rejected"""
+        executor = hashing.HashingExecutor(
+            workers=1, max_pending=1, queue_timeout=0.01
+        )
+        try:
+            future = executor.submit(time.sleep, 0.5)
+            with self.assertRaises(hashing.HashingBusy):
+                executor.submit(time.sleep, 0)
+            future.result()
+
+            # The slot is released once the running job is done
+            executor.run(time.sleep, 0)
+        finally:
+            executor.shutdown()
+
+    def test_bulk_hashing_waits_for_slots(self):
+        """Test that bulk hashing uses at most max_pending chunks and waits"""
+        executor = hashing.HashingExecutor(
+            workers=1, max_pending=2, queue_timeout=0.01
+        )
+        passwords = [f'testpass{i}00' for i in range(5)]
+        try:
+            executor.submit(time.sleep, 0.3)
+            with mock.patch.object(hashing, 'get_executor',
+                                   return_value=executor), \
+                    mock.patch.object(executor, 'submit',
+                                      wraps=executor.submit) as submit:
+                encoded = hashing.hash_passwords(passwords)
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(submit.call_count, 2)
+        for password, hashed in zip(passwords, encoded):
+            self.assertTrue(check_password(password, hashed))
+
+    def test_login_returns_503_when_busy(self):
+        """Test that a saturated pool answers logins with a 503"""
+        user = get_user_model().objects.create_user(
+            email='test@email.com', password='testpass123'
+        )
+        client = APIClient()
+
+        with mock.patch.object(hashing.HashingExecutor, 'run',
+                               side_effect=hashing.HashingBusy):
+            response = client.post(JWT_OBTAIN_URL, {
+                'email': user.email,
+                'password': 'testpass123',
+            })
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
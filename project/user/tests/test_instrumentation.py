@@ -0,0 +1,119 @@
+import multiprocessing
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework import status
+
+from designh import metrics
+
+
+ABOUT_USER_URL = reverse('user:aboutme')
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+METRICS_URL = reverse('metrics')
+
+
+def observe_in_child():
+    metrics.observe('user:aboutme', {'total': 0.003})
+
+
+def server_timing(response):
+    """Return the phases of a Server-Timing header as a dictionary"""
+    phases = {}
+    for entry in response['Server-Timing'].split(', '):
+        phase, *params = entry.split(';')
+        phases[phase] = params
+    return phases
+
+
+class PerformanceMiddlewareTest(APITestCase):
+    """
+    Test the per-request performance breakdown.
+    """
+
+    def setUp(self):
+        self.password = 'testpass876'
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            name='Test Johnson',
+            password=self.password
+        )
+        self.client = APIClient()
+        self.access = RefreshToken.for_user(self.user).access_token
+        metrics.reset()
+
+    def test_server_timing_phases(self):
+        """Test that every phase of an authenticated request is reported"""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        response = self.client.get(ABOUT_USER_URL)
+
+        phases = server_timing(response)
+        self.assertEqual(set(phases), {'auth', 'render', 'db', 'total'})
+        # The authenticated user, then the row read after its version
+        self.assertIn('desc="2 queries"', phases['db'])
+
+    def test_server_timing_hashing(self):
+        """Test that logins report the time spent hashing"""
+        response = self.client.post(JWT_OBTAIN_URL, {
+            'email': self.user.email,
+            'password': self.password,
+        })
+
+        self.assertIn('hash', server_timing(response))
+
+    def test_metrics_endpoint(self):
+        """Test that the histograms are exposed to internal clients"""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        self.client.get(ABOUT_USER_URL)
+        response = self.client.get(METRICS_URL, REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            b'designh_request_phase_seconds_count'
+            b'{view="user:aboutme",phase="total"} 1',
+            response.content,
+        )
+        self.assertIn(b'designh_token_cache_hits', response.content)
+
+    def test_metrics_endpoint_forbidden(self):
+        """Test that external clients cannot read the metrics"""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        response = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SharedHistogramsTest(SimpleTestCase):
+    """
+    Test the histograms shared by the server processes.
+    """
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_observations_of_forked_processes_are_reported(self):
+        """Test that a scrape reports the requests of every worker"""
+        metrics.observe('user:aboutme', {'total': 0.02})
+        process = multiprocessing.get_context('fork').Process(
+            target=observe_in_child
+        )
+        process.start()
+        process.join()
+
+        output = metrics.render_prometheus()
+        self.assertIn('designh_request_phase_seconds_count'
+                      '{view="user:aboutme",phase="total"} 2', output)
+        self.assertIn('designh_request_phase_seconds_bucket'
+                      '{view="user:aboutme",phase="total",le="0.005"} 1',
+                      output)
+
+    def test_observations_dropped_when_full(self):
+        """Test that series beyond the capacity are counted as dropped"""
+        histograms = metrics.Histograms(max_series=2)
+        histograms.observe('view', {'a': 0.1, 'b': 0.1, 'c': 0.1})
+
+        dropped, series = histograms.snapshot()
+        self.assertEqual(dropped, 1)
+        self.assertEqual(len(series), 2)
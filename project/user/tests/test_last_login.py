@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import last_login
+from user.last_login import LastLoginRecorder, get_last_login_recorder
+from user.throttling import get_buckets
+
+
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+
+
+class LastLoginRecorderTest(TransactionTestCase):
+    """
+    Test the write-behind recording of login times.
+    """
+
+    def setUp(self):
+        get_buckets().clear()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'user{i}@email.com', password='testpass123'
+            )
+            for i in range(3)
+        ]
+
+    def test_token_issue_does_not_write(self):
+        """Test that obtaining a token buffers the login without an UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post(JWT_OBTAIN_URL, {
+                'email': 'user0@email.com', 'password': 'testpass123',
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries
+                          if query['sql'].startswith('UPDATE')])
+
+        get_last_login_recorder().flush()
+        self.users[0].refresh_from_db()
+        self.assertIsNotNone(self.users[0].last_login)
+
+    def test_logins_coalesced_per_user(self):
+        """Test that only the latest login of a user is written"""
+        recorder = LastLoginRecorder(flush_interval=None, batch_size=2,
+                                     max_pending=100)
+        now = timezone.now()
+        for user in self.users:
+            recorder.record(user.pk, now - timedelta(minutes=5))
+        recorder.record(self.users[0].pk, now)
+        recorder.record(self.users[0].pk, now - timedelta(minutes=1))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recorder.flush(), 3)
+
+        self.assertEqual(len([query for query in queries
+                              if query['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(recorder.stats(),
+                         {'pending': 0, 'flushed': 3, 'statements': 2,
+                          'dropped': 0})
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].last_login, now)
+        self.assertEqual(recorder.flush(), 0)
+
+    def test_buffer_is_bounded(self):
+        """Test that the oldest logins are dropped past max_pending"""
+        recorder = LastLoginRecorder(flush_interval=None, batch_size=10,
+                                     max_pending=2)
+        now = timezone.now()
+        recorder.record(self.users[0].pk, now)
+        recorder.record(self.users[1].pk, now)
+        recorder.record(self.users[0].pk, now + timedelta(seconds=1))
+        recorder.record(self.users[2].pk, now)
+
+        self.assertEqual(recorder.stats()['pending'], 2)
+        self.assertEqual(recorder.stats()['dropped'], 1)
+        recorder.flush()
+        self.users[1].refresh_from_db()
+        self.assertIsNone(self.users[1].last_login)
+
+    def test_flushed_at_exit(self):
+        """Test that a new recorder is flushed when the process exits"""
+        with mock.patch.object(last_login, '_recorder', None), \
+                mock.patch('atexit.register') as register:
+            recorder = get_last_login_recorder()
+
+        register.assert_called_once_with(recorder.flush)
+
+    def test_no_thread_without_interval(self):
+        """Test that only explicit flushes write without a flush interval"""
+        recorder = LastLoginRecorder(flush_interval=None, batch_size=10,
+                                     max_pending=100)
+        recorder.record(self.users[0].pk, timezone.now())
+
+        self.assertIsNone(recorder._thread)
+        self.assertEqual(recorder.flush(), 1)
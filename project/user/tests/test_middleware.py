@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+ABOUT_USER_URL = reverse('user:aboutme')
+ADMIN_LOGIN_URL = reverse('admin:login')
+CHANGELIST_URL = reverse('admin:user_customuser_changelist')
+
+
+class APIMiddlewareTest(TestCase):
+    """
+    Test that API requests skip the middleware only the admin needs.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@email.com', password='testpass876'
+        )
+        self.access = RefreshToken.for_user(self.user).access_token
+
+    def test_api_skips_session_and_messages(self):
+        """Test that API requests get no session, CSRF or messages"""
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(ABOUT_USER_URL,
+                              HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request = response.wsgi_request
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, '_messages'))
+        self.assertEqual(response.cookies, {})
+
+    def test_api_writes_need_no_csrf_token(self):
+        """Test that JWT authenticated writes are not CSRF checked"""
+        client = Client(enforce_csrf_checks=True)
+        response = client.patch(ABOUT_USER_URL, {'name': 'New'},
+                                content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_admin_keeps_full_stack(self):
+        """Test that the admin still has sessions and CSRF protection"""
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(ADMIN_LOGIN_URL, {
+            'username': 'admin@email.com', 'password': 'testpass876',
+        })
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_login(self.user)
+        response = client.get(CHANGELIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+
+from user.password_validation import PasswordList, \
+    PasswordPolicyValidator, compile_password_list, write_password_list
+
+
+REGISTER_USER_URL = reverse('user:register')
+
+
+class PasswordListTest(SimpleTestCase):
+    """
+    Test the compiled password list format.
+    """
+
+    def test_compiled_list_lookup(self):
+        """Test that plain and SHA-1 entries are found and others are not"""
+        with tempfile.TemporaryDirectory() as tmp:
+            plain = os.path.join(tmp, 'plain.txt')
+            with open(plain, 'w') as f:
+                f.write('hunter2\nCorrectHorse\n')
+            sha1 = os.path.join(tmp, 'sha1.txt')
+            with open(sha1, 'w') as f:
+                digest = hashlib.sha1(b'Breached99').hexdigest().upper()
+                f.write(f'{digest}:42\n')
+
+            passwords = PasswordList(compile_password_list([plain], [sha1]))
+
+        self.assertEqual(len(passwords), 3)
+        self.assertIn('HUNTER2', passwords)
+        self.assertIn('correcthorse', passwords)
+        self.assertIn('Breached99', passwords)
+        self.assertNotIn('breached99', passwords)
+        self.assertNotIn('testpass123', passwords)
+
+    def test_long_list_merged_from_runs(self):
+        """Test that lists longer than a run are sorted in runs and merged"""
+        words = [f'password{i % 40}' for i in range(100, 0, -1)]
+        with tempfile.TemporaryDirectory() as tmp:
+            plain = os.path.join(tmp, 'plain.txt')
+            with open(plain, 'w') as f:
+                f.write('\n'.join(words))
+
+            f = BytesIO()
+            count = write_password_list(f, [plain], run_size=7)
+            in_memory = compile_password_list([plain])
+
+        passwords = PasswordList(f.getvalue())
+        self.assertEqual(count, 40)
+        self.assertEqual(len(passwords), 40)
+        self.assertEqual(f.getvalue(), in_memory)
+        for word in set(words):
+            self.assertIn(word, passwords)
+        self.assertNotIn('password40', passwords)
+
+    def test_validator_uses_compiled_file(self):
+        """Test that the validator memory-maps the compiled list"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'passwords.bin')
+            call_command('compile_passwords', path, stdout=StringIO())
+            validator = PasswordPolicyValidator(password_list_path=path)
+
+            with self.assertRaises(ValidationError) as cm:
+                validator.validate('password123')
+            validator.passwords._data.close()
+
+        self.assertEqual(cm.exception.error_list[0].code,
+                         'password_too_common')
+
+    def test_validator_reports_every_failure(self):
+        """Test that every broken rule is reported in one pass"""
+        with self.assertRaises(ValidationError) as cm:
+            PasswordPolicyValidator().validate('ab cd')
+
+        self.assertEqual(
+            [error.code for error in cm.exception.error_list],
+            ['password_too_short', 'password_whitespace',
+             'password_not_alphanumeric'],
+        )
+
+
+class RegisterPasswordPolicyTest(APITestCase):
+    """
+    Test that registration applies the password policy.
+    """
+
+    def test_common_password_rejected(self):
+        """Test that a common password cannot be used to register"""
+        response = APIClient().post(REGISTER_USER_URL, {
+            'email': 'test@email.com',
+            'name': 'John Doe',
+            'password': 'password123',
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['password'],
+                         ['This password is too common.'])
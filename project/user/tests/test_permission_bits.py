@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, \
+    force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.models import Designer
+from user import permission_bits
+from user.backends import PermissionBitsBackend
+from user.permission_bits import decode_bits, encode_bits, \
+    get_permission_bits
+from user.throttling import get_buckets
+
+
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+JWT_REFRESH_URL = reverse('user:token_refresh')
+
+
+class DesignerWriteView(APIView):
+    queryset = Designer.objects.none()
+    permission_classes = [permissions.DjangoModelPermissions]
+
+    def post(self, request):
+        return Response({})
+
+
+class PermissionBitsTest(TestCase):
+    """
+    Test permission checks answered from precomputed bits.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com', password='testpass123'
+        )
+        self.group = Group.objects.create(name='editors')
+        self.user.groups.add(self.group)
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='view_design')
+        )
+        self.group.permissions.add(
+            Permission.objects.get(codename='add_designer')
+        )
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_direct_and_group_permissions(self):
+        """Test that direct and group permissions are both granted"""
+        user = self.fresh_user()
+
+        self.assertTrue(user.has_perm('catalog.view_design'))
+        self.assertTrue(user.has_perm('catalog.add_designer'))
+        self.assertFalse(user.has_perm('catalog.delete_designer'))
+        self.assertFalse(user.has_perm('catalog.missing'))
+        self.assertTrue(user.has_module_perms('catalog'))
+        self.assertFalse(user.has_module_perms('admin'))
+        self.assertEqual(user.get_all_permissions(),
+                         {'catalog.view_design', 'catalog.add_designer'})
+
+    def test_superuser_holds_every_permission(self):
+        """Test that the backend grants active superusers everything"""
+        backend = PermissionBitsBackend()
+        user = self.fresh_user()
+        user.is_superuser = True
+
+        with self.assertNumQueries(0):
+            self.assertTrue(backend.has_perm(user, 'catalog.missing'))
+            self.assertTrue(backend.has_module_perms(user, 'unknown'))
+        user.is_active = False
+        self.assertFalse(backend.has_perm(user, 'catalog.view_design'))
+        self.assertFalse(backend.has_module_perms(user, 'catalog'))
+
+    def test_cached_checks_cost_no_query(self):
+        """Test that checks on a newly loaded user are served from cache"""
+        self.fresh_user().has_perm('catalog.view_design')
+        user = self.fresh_user()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('catalog.add_designer'))
+            self.assertFalse(user.has_perm('catalog.change_designer'))
+
+    def test_drf_permission_class_costs_no_query(self):
+        """Test that DjangoModelPermissions is answered without a query"""
+        self.fresh_user().has_perm('catalog.add_designer')
+        request = APIRequestFactory().post('/', {})
+        force_authenticate(request, user=self.fresh_user())
+
+        with self.assertNumQueries(0):
+            response = DesignerWriteView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_group_permission_change_invalidates(self):
+        """Test that a permission added to a group reaches its users"""
+        self.assertFalse(
+            self.fresh_user().has_perm('catalog.change_designer')
+        )
+        self.group.permissions.add(
+            Permission.objects.get(codename='change_designer')
+        )
+
+        self.assertTrue(self.fresh_user().has_perm('catalog.change_designer'))
+
+    def test_membership_change_invalidates(self):
+        """Test that leaving a group removes its permissions"""
+        self.assertTrue(self.fresh_user().has_perm('catalog.add_designer'))
+        self.group.user_set.remove(self.user)
+
+        self.assertFalse(self.fresh_user().has_perm('catalog.add_designer'))
+
+    def test_revoke_during_compute_invalidates(self):
+        """Test that bits computed before a revoke are not cached past it"""
+        compute = permission_bits.compute_permission_bits
+
+        def compute_then_revoke(user_id):
+            bits = compute(user_id)
+            self.group.user_set.remove(self.user)
+            return bits
+
+        with mock.patch.object(permission_bits, 'compute_permission_bits',
+                               side_effect=compute_then_revoke):
+            self.assertTrue(
+                self.fresh_user().has_perm('catalog.add_designer')
+            )
+
+        self.assertFalse(self.fresh_user().has_perm('catalog.add_designer'))
+
+    def test_encode_round_trip(self):
+        """Test that bits survive the claim encoding"""
+        for bits in (0, 1, 1 << 200 | 1 << 3):
+            self.assertEqual(decode_bits(encode_bits(bits)), bits)
+
+    @override_settings(PERMISSIONS={'IN_TOKEN': True})
+    def test_bits_embedded_in_token(self):
+        """Test that tokens carry the bits, refreshed on token refresh"""
+        get_buckets().clear()
+        client = APIClient()
+        response = client.post(JWT_OBTAIN_URL, {
+            'email': 'test@email.com', 'password': 'testpass123',
+        })
+        claim = AccessToken(response.data['access'])['perms']
+        self.assertEqual(decode_bits(claim),
+                         get_permission_bits(self.user.pk))
+
+        self.user.user_permissions.clear()
+        response = client.post(JWT_REFRESH_URL,
+                               {'refresh': response.data['refresh']})
+        self.assertNotEqual(AccessToken(response.data['access'])['perms'],
+                            claim)
@@ -0,0 +1,95 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from designh.profiling import get_ring
+from user.throttling import get_buckets
+
+
+REGISTER_USER_URL = reverse('user:register')
+
+
+class ProfilingMiddlewareTest(APITestCase):
+    """
+    Test the on-demand request profiler and its report.
+    """
+
+    def setUp(self):
+        get_buckets().clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        profiling = self.profiling_settings()
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+        self.client = APIClient()
+
+    def profiling_settings(self, **options):
+        return override_settings(PROFILING={
+            'TOKEN': 'secret',
+            'DIRECTORY': self.directory.name,
+            'MAX_PROFILES': 3,
+            **options,
+        })
+
+    def register(self, index, **headers):
+        return self.client.post(REGISTER_USER_URL, {
+            'email': f'test{index}@email.com',
+            'name': 'Test Johnson',
+            'password': 'testpass876',
+        }, **headers)
+
+    def test_profiled_with_token(self):
+        """Test that a request with the token is profiled"""
+        response = self.register(0, HTTP_X_PROFILE='secret')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        profiles = get_ring().profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0].view, 'user.register')
+        self.assertTrue(profiles[0].path.endswith(response['X-Profile']))
+
+    def test_not_profiled_without_token(self):
+        """Test that other requests are left alone"""
+        response = self.register(0, HTTP_X_PROFILE='guess')
+
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(get_ring().profiles(), [])
+
+    def test_non_ascii_token(self):
+        """Test that a non ASCII header is refused rather than failing"""
+        response = self.register(0, HTTP_X_PROFILE='s\xe9cret')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('X-Profile', response)
+
+    def test_sampled(self):
+        """Test that a sample rate of 1 profiles every request"""
+        with self.profiling_settings(SAMPLE_RATE=1.0):
+            self.register(0)
+
+        self.assertEqual(len(get_ring().profiles()), 1)
+
+    def test_ring_is_bounded(self):
+        """Test that only the latest MAX_PROFILES profiles are kept"""
+        names = [self.register(i, HTTP_X_PROFILE='secret')['X-Profile']
+                 for i in range(5)]
+
+        kept = [profile.path for profile in get_ring().profiles()]
+        self.assertEqual(len(kept), 3)
+        self.assertTrue(kept[-1].endswith(names[-1]))
+
+    def test_report(self):
+        """Test that the command aggregates the hottest functions"""
+        self.register(0, HTTP_X_PROFILE='secret')
+        self.register(1, HTTP_X_PROFILE='secret')
+        out = StringIO()
+
+        call_command('profiles', view='user:register', top=5, stdout=out)
+
+        self.assertIn('over 2 profiles', out.getvalue())
+        self.assertIn('cumulative', out.getvalue())
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.rehash import get_rehasher
+from user.throttling import get_buckets
+
+
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+JWT_REFRESH_URL = reverse('user:token_refresh')
+
+
+def login(email, password):
+    get_buckets().clear()
+    return APIClient().post(JWT_OBTAIN_URL, {
+        'email': email, 'password': password,
+    })
+
+
+class RehashOnLoginTest(TransactionTestCase):
+    """
+    Test that outdated password hashes are upgraded at login.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            email='test@email.com',
+            password=make_password('testpass123', hasher='pbkdf2_sha1'),
+        )
+
+    @override_settings(PASSWORD_HASHING={'ITERATIONS': 1000})
+    def test_rehash_deferred(self):
+        """Test that the login answers first and the hash is then upgraded"""
+        done = get_rehasher().stats()['done']
+        response = login('test@email.com', 'testpass123')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        get_rehasher().join()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.user.check_password('testpass123'))
+        self.assertEqual(get_rehasher().stats()['done'], done + 1)
+
+    @override_settings(PASSWORD_HASHING={'ITERATIONS': 1000})
+    def test_rehash_keeps_refresh_token(self):
+        """Test that upgrading the hash does not revoke the login's tokens"""
+        response = login('test@email.com', 'testpass123')
+        get_rehasher().join()
+
+        response = APIClient().post(JWT_REFRESH_URL,
+                                    {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_wrong_password_not_rehashed(self):
+        """Test that a failed login leaves the hash untouched"""
+        encoded = self.user.password
+        response = login('test@email.com', 'wrongpass123')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        get_rehasher().join()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+
+class RehashInlineTest(TestCase):
+    """
+    Test the rehash when it is not deferred.
+    """
+
+    @override_settings(PASSWORD_HASHING={'ITERATIONS': 1000,
+                                         'DEFER_REHASH': False})
+    def test_rehash_inline(self):
+        """Test that the hash is upgraded before the login answers"""
+        user = get_user_model().objects.create(
+            email='test@email.com',
+            password=make_password('testpass123', hasher='pbkdf2_sha1'),
+        )
+
+        response = login('test@email.com', 'testpass123')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+
+class CalibrateHashersTest(TestCase):
+    """
+    Test the calibrate_hashers management command.
+    """
+
+    def test_recommendation_and_outdated_share(self):
+        """Test that iterations are recommended and old hashes counted"""
+        get_user_model().objects.create_user(
+            email='current@email.com', password='testpass123'
+        )
+        get_user_model().objects.create(
+            email='old@email.com',
+            password=make_password('testpass123', hasher='pbkdf2_sha1'),
+        )
+        out = StringIO()
+
+        call_command('calibrate_hashers', rounds=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('pbkdf2_sha256: ', output)
+        self.assertIn('recommended iterations=', output)
+        self.assertIn('50.0% of users are on outdated parameters', output)
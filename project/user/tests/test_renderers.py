@@ -0,0 +1,51 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from user.renderers import FastJSONRenderer
+from user.serializers import UserReadSerializer, UserSerializer
+
+
+class ReadPathSerializationTest(SimpleTestCase):
+    """
+    Test that the read path produces the same bytes as the default one.
+    """
+
+    def setUp(self):
+        self.user = get_user_model()(
+            email='tést@email.com', name='Test\u2028Johnson "TJ"'
+        )
+
+    def test_output_is_byte_identical(self):
+        """Test the read path against UserSerializer and JSONRenderer"""
+        expected = JSONRenderer().render(UserSerializer(self.user).data)
+        actual = FastJSONRenderer().render(UserReadSerializer(self.user).data)
+
+        self.assertEqual(actual, expected)
+
+    def test_indented_output_is_byte_identical(self):
+        """Test that requested indentation is still honoured"""
+        media_type = 'application/json; indent=4'
+        data = UserReadSerializer([self.user, self.user], many=True).data
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type, {}),
+            JSONRenderer().render(data, media_type, {}),
+        )
+
+    def test_large_payload_is_compressed(self):
+        """Test that large bodies are gzipped when the client accepts it"""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = Response()
+        data = UserReadSerializer([self.user] * 100, many=True).data
+
+        content = FastJSONRenderer().render(data, None, {
+            'request': request, 'response': response,
+        })
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(content),
+                         JSONRenderer().render(data))
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from designh.db.router import ReplicaHealth, ReplicaRouter
+from designh.middleware import STICKY_COOKIE, ReplicaMiddleware
+
+
+User = get_user_model()
+
+
+@override_settings(REPLICATION={
+    'REPLICAS': ['replica_a', 'replica_b'],
+    'STICKY_SECONDS': 0.2,
+})
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Test routing of reads to healthy replicas and read-your-writes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.lags = {'replica_a': 0.0, 'replica_b': 0.0}
+        self.probes = []
+        self.router = ReplicaRouter()
+        self.router.health = ReplicaHealth(check_interval=60, max_lag=5,
+                                           probe=self.probe)
+        self.factory = RequestFactory()
+
+    def probe(self, alias):
+        self.probes.append(alias)
+        lag = self.lags[alias]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    def wait_for_probes(self):
+        for thread in threading.enumerate():
+            if thread.name.startswith('replica-probe-'):
+                thread.join()
+
+    def reads(self, count=50):
+        self.router.db_for_read(User)
+        self.wait_for_probes()
+        return {self.router.db_for_read(User) for _ in range(count)}
+
+    def test_reads_spread_over_replicas(self):
+        """Test that reads go to every replica and writes to the primary"""
+        self.assertEqual(self.reads(), {'replica_a', 'replica_b'})
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_unhealthy_replicas_are_skipped(self):
+        """Test that failing and lagging replicas take no reads"""
+        self.lags = {'replica_a': ConnectionError(), 'replica_b': 30.0}
+
+        self.assertEqual(self.reads(), {'default'})
+
+    def test_health_is_cached(self):
+        """Test that a replica is probed once per check interval"""
+        self.reads()
+
+        self.assertEqual(sorted(self.probes), ['replica_a', 'replica_b'])
+
+    def test_probes_do_not_block(self):
+        """Test that reads go to the primary while a first probe hangs"""
+        release = threading.Event()
+        self.probe = lambda alias: release.wait()
+        self.router.health.probe = self.probe
+        start = time.monotonic()
+
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertLess(time.monotonic() - start, 1)
+        release.set()
+        self.wait_for_probes()
+
+    def test_migrations_skip_replicas(self):
+        """Test that migrations only run on the primary"""
+        self.assertFalse(self.router.allow_migrate('replica_a', 'user'))
+        self.assertIsNone(self.router.allow_migrate('default', 'user'))
+
+    def request(self, method, authorization, write=False,
+                address='10.0.0.1', cookie=None):
+        """Run a request through the middleware, return the read alias"""
+        self.reads(1)
+        reads = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(User)
+            reads.append(self.router.db_for_read(User))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)(
+            '/', HTTP_AUTHORIZATION=authorization, REMOTE_ADDR=address
+        )
+        if cookie:
+            request.COOKIES[STICKY_COOKIE] = cookie.value
+        self.response = ReplicaMiddleware(view)(request)
+        return reads[0]
+
+    def test_reads_follow_writes(self):
+        """Test that a client reads from the primary after it wrote"""
+        self.assertEqual(self.request('patch', 'Bearer a', write=True),
+                         'default')
+        self.assertEqual(self.request('get', 'Bearer a'), 'default')
+
+        time.sleep(0.3)
+        self.assertNotEqual(self.request('get', 'Bearer a'), 'default')
+
+    def test_cookie_is_pinned(self):
+        """Test that a token obtained after registering reads the primary"""
+        self.request('post', '', write=True)
+        cookie = self.response.cookies[STICKY_COOKIE]
+
+        self.assertEqual(self.request('get', 'Bearer new', cookie=cookie),
+                         'default')
+        time.sleep(0.3)
+        self.assertNotEqual(self.request('get', 'Bearer new', cookie=cookie),
+                            'default')
+
+    def test_other_clients_use_replicas(self):
+        """Test that clients sharing the address of a writer are not pinned"""
+        self.request('post', 'Bearer a', write=True)
+
+        self.assertNotEqual(self.request('get', 'Bearer b'), 'default')
+        self.assertNotEqual(self.request('get', ''), 'default')
@@ -0,0 +1,146 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.cache import get_cached_profiles, set_cached_profiles
+
+
+RESOLVE_URL = reverse('user:resolve')
+
+
+class UserResolveTest(APITestCase):
+    """
+    Test the batch resolution of user ids for internal services.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'test{i}@email.com', name=f'Test {i}',
+                password='testpass876',
+            )
+            for i in range(3)
+        ]
+        self.ids = [user.pk for user in self.users]
+        self.service = get_user_model().objects.create_user(
+            email='service@email.com', password='testpass876'
+        )
+        self.service.user_permissions.add(
+            Permission.objects.get(codename='view_customuser')
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=(
+            f'Bearer {RefreshToken.for_user(self.service).access_token}'
+        ))
+
+    def resolve(self, ids, **params):
+        return self.client.get(RESOLVE_URL, {
+            'ids': ','.join(map(str, ids)), **params,
+        })
+
+    def test_resolve_with_single_query(self):
+        """Test that users are read with one query, then from the cache"""
+        # Cache the permissions of the service account
+        self.resolve([])
+        # The service account itself is read once per request
+        with self.assertNumQueries(2):
+            response = self.resolve(self.ids)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['users'], [
+            {'id': user.pk, 'email': user.email, 'name': user.name}
+            for user in self.users
+        ])
+        self.assertEqual(response.data['missing'], [])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.resolve(self.ids).data, response.data)
+
+    def test_sparse_fields(self):
+        """Test that only the requested fields are returned"""
+        response = self.resolve(self.ids[:1], fields='name')
+
+        self.assertEqual(response.data['users'],
+                         [{'id': self.ids[0], 'name': 'Test 0'}])
+
+    def test_unknown_field(self):
+        """Test that unknown fields are rejected"""
+        response = self.resolve(self.ids, fields='password')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_users(self):
+        """Test that ids without a user are reported"""
+        response = self.resolve([self.ids[0], 999999])
+
+        self.assertEqual(len(response.data['users']), 1)
+        self.assertEqual(response.data['missing'], [999999])
+
+    def test_save_invalidates_cache(self):
+        """Test that a changed user is not served from the cache"""
+        self.resolve(self.ids)
+        self.users[0].name = 'New Name'
+        self.users[0].save()
+
+        response = self.resolve(self.ids[:1], fields='name')
+
+        self.assertEqual(response.data['users'][0]['name'], 'New Name')
+
+    @override_settings(USER_RESOLUTION={'MAX_IDS': 2})
+    def test_too_many_ids(self):
+        """Test that at most MAX_IDS ids are resolved at once"""
+        response = self.resolve(self.ids)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_ids(self):
+        """Test that ids must be integers"""
+        response = self.resolve(['1', 'abc'])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(USER_RESOLUTION={'STREAM_MIN_IDS': 2})
+    def test_large_answers_are_streamed(self):
+        """Test that large answers are streamed with the same content"""
+        self.resolve(self.ids[:1])
+        response = self.resolve(self.ids + [999999])
+
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(sorted(user['id'] for user in data['users']),
+                         self.ids)
+        self.assertEqual(data['missing'], [999999])
+
+    def test_anonymous_clients_are_rejected(self):
+        """Test that anonymous requests cannot resolve users, even local"""
+        response = APIClient().get(RESOLVE_URL, {'ids': self.ids[0]},
+                                   REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_permission_is_required(self):
+        """Test that users without view_customuser cannot resolve users"""
+        access = RefreshToken.for_user(self.users[0]).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.resolve(self.ids)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stale_fill_is_not_served(self):
+        """Test that a row read before a change is never served cached"""
+        _, versions = get_cached_profiles(self.ids[:1])
+        stale = {'id': self.ids[0], 'email': 'test0@email.com',
+                 'name': 'Test 0'}
+        self.users[0].name = 'New Name'
+        self.users[0].save()
+        set_cached_profiles([stale], versions)
+
+        self.assertEqual(get_cached_profiles(self.ids[:1])[0], {})
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.revocation import RevocationList, RevocationListFull
+from user.serializers import TokenObtainPairSerializer
+
+
+JWT_REFRESH_URL = reverse('user:token_refresh')
+JWT_VERIFY_URL = reverse('user:token_verify')
+
+
+def _revoke(revocations):
+    revocations.add('forked', time.time() + 60)
+
+
+def _die_holding_lock(revocations):
+    with revocations._shared.lock(1):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+class RevocationListTest(SimpleTestCase):
+    """
+    Test the shared memory list of revoked token ids.
+    """
+
+    def test_add_and_contains(self):
+        """Test that a revoked id is found and can only be added once"""
+        revocations = RevocationList(capacity=100, lifetime=60)
+
+        self.assertTrue(revocations.add('a', time.time() + 60))
+        self.assertFalse(revocations.add('a', time.time() + 60))
+        self.assertIn('a', revocations)
+        self.assertNotIn('b', revocations)
+
+    def test_expired_ids_are_pruned(self):
+        """Test that expired ids are gone and their generation is reused"""
+        revocations = RevocationList(capacity=2, lifetime=0.05)
+        revocations.add('a', time.time() + 0.05)
+        revocations.add('b', time.time() + 0.05)
+        self.assertNotIn('c', revocations)
+
+        time.sleep(0.2)
+        self.assertNotIn('a', revocations)
+        for jti in ('c', 'd', 'e', 'f'):
+            revocations.add(jti, time.time() + 0.05)
+            time.sleep(0.06)
+        self.assertEqual(revocations.stats()['entries'], 2)
+
+    def test_full(self):
+        """Test that revoking past capacity is refused"""
+        revocations = RevocationList(capacity=2, lifetime=60)
+        revocations.add('a', time.time() + 60)
+        revocations.add('b', time.time() + 60)
+
+        with self.assertRaises(RevocationListFull):
+            revocations.add('c', time.time() + 60)
+
+    def test_shared_with_forked_processes(self):
+        """Test that an id revoked in a forked process is seen here"""
+        revocations = RevocationList(capacity=100, lifetime=60)
+        process = multiprocessing.get_context('fork').Process(
+            target=_revoke, args=(revocations,)
+        )
+        process.start()
+        process.join()
+
+        self.assertIn('forked', revocations)
+
+    def test_lock_released_when_holder_dies(self):
+        """Test that a process killed holding the lock does not block"""
+        revocations = RevocationList(capacity=100, lifetime=60)
+        process = multiprocessing.get_context('fork').Process(
+            target=_die_holding_lock, args=(revocations,)
+        )
+        process.start()
+        process.join()
+
+        self.assertEqual(process.exitcode, -signal.SIGKILL)
+        self.assertTrue(revocations.add('a', time.time() + 60))
+        self.assertIn('a', revocations)
+
+    def test_persist_and_load(self):
+        """Test that a snapshot restores the revocations"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'var', 'revocations.bin')
+        revocations = RevocationList(capacity=100, lifetime=60, path=path)
+        revocations.add('a', time.time() + 60)
+
+        self.assertTrue(revocations.persist())
+        self.assertFalse(revocations.persist())
+        restored = RevocationList(capacity=100, lifetime=60, path=path)
+        self.assertIn('a', restored)
+
+    @mock.patch.object(RevocationList, '_start_persister')
+    def test_persist_skipped_when_unchanged(self, _):
+        """Test that a snapshot is only written after a change"""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'revocations.bin')
+        revocations = RevocationList(capacity=100, lifetime=60, path=path,
+                                     persist_interval=0)
+
+        self.assertFalse(revocations.persist())
+        self.assertFalse(os.path.exists(path))
+        revocations.add('a', time.time() + 60)
+        self.assertTrue(revocations.persist())
+        self.assertFalse(revocations.persist())
+
+        restored = RevocationList(capacity=100, lifetime=60, path=path,
+                                  persist_interval=0)
+        self.assertFalse(restored.persist())
+        restored.add('b', time.time() + 60)
+        self.assertTrue(restored.persist())
+
+
+class RefreshRotationTest(APITestCase):
+    """
+    Test refresh token rotation through the API.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    def test_refresh_rotates(self):
+        """Test that a refresh returns a new refresh token that works"""
+        response = self.client.post(JWT_REFRESH_URL,
+                                    {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+
+        response = self.client.post(JWT_REFRESH_URL,
+                                    {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_replayed_refresh_rejected(self):
+        """Test that a rotated refresh token cannot be used again"""
+        self.client.post(JWT_REFRESH_URL, {'refresh': self.refresh})
+
+        response = self.client.post(JWT_REFRESH_URL,
+                                    {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(JWT_VERIFY_URL, {'token': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_password_change_revokes(self):
+        """Test that changing the password revokes issued refresh tokens"""
+        refresh = str(TokenObtainPairSerializer.get_token(self.user))
+        self.user.change_password('newpass9876')
+        self.user.save()
+
+        response = self.client.post(JWT_REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        refresh = str(TokenObtainPairSerializer.get_token(self.user))
+        response = self.client.post(JWT_REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
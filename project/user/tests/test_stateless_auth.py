@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.cache import bump_user_version, get_user_version
+from user.stateless import StatelessUser, is_current
+from user.throttling import get_buckets
+
+
+ABOUT_USER_URL = reverse('user:aboutme')
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+JWT_REFRESH_URL = reverse('user:token_refresh')
+
+
+@override_settings(STATELESS_AUTH={'ENABLED': True})
+class StatelessAuthenticationTest(APITestCase):
+    """
+    Test authentication from the claims of the token in stateless mode.
+    """
+
+    def setUp(self):
+        cache.clear()
+        get_buckets().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            name='Test Johnson',
+            password='testpass876'
+        )
+        self.client = APIClient()
+        response = self.client.post(JWT_OBTAIN_URL, {
+            'email': 'test@email.com', 'password': 'testpass876',
+        })
+        self.access = response.data['access']
+        self.refresh = response.data['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_token_carries_profile(self):
+        """Test that issued tokens carry the profile and version claims"""
+        token = AccessToken(self.access)
+
+        self.assertEqual(token['email'], 'test@email.com')
+        self.assertEqual(token['name'], 'Test Johnson')
+        self.assertFalse(token['is_staff'])
+        self.assertIn('ver', token)
+
+    def test_aboutme_without_query(self):
+        """Test that aboutme is served without any database query"""
+        with self.assertNumQueries(0):
+            response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data,
+                         {'email': 'test@email.com', 'name': 'Test Johnson'})
+
+    def test_changed_user_falls_back_to_database(self):
+        """Test that a token older than the last change reads the row"""
+        self.user.name = 'New Name'
+        self.user.save()
+
+        # The user, then the row read after its version for the body
+        with self.assertNumQueries(2):
+            response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.data['name'], 'New Name')
+
+    def test_deactivated_user_is_rejected(self):
+        """Test that deactivating a user revokes stateless access"""
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_updates_profile(self):
+        """Test that refreshed access tokens carry the current profile"""
+        self.user.name = 'New Name'
+        self.user.save()
+
+        response = self.client.post(JWT_REFRESH_URL,
+                                    {'refresh': self.refresh})
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}'
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.data['name'], 'New Name')
+
+    def test_change_during_issue_is_not_current(self):
+        """Test that a change racing the token issue outdates the token"""
+        def version_then_change(user_id):
+            version = get_user_version(user_id)
+            get_user_model().objects.filter(pk=user_id).update(name='Raced')
+            bump_user_version(user_id)
+            return version
+
+        with mock.patch('user.stateless.get_user_version',
+                        side_effect=version_then_change):
+            response = self.client.post(JWT_OBTAIN_URL, {
+                'email': 'test@email.com', 'password': 'testpass876',
+            })
+
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['name'], 'Raced')
+        self.assertFalse(is_current(token))
+
+    def test_permissions_of_stateless_user(self):
+        """Test that a stateless user is granted its permissions"""
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='add_designer')
+        )
+        user = StatelessUser(AccessToken(self.access))
+
+        self.assertTrue(user.has_perm('catalog.add_designer'))
+        self.assertFalse(user.has_perm('catalog.delete_designer'))
+        self.assertTrue(user.has_module_perms('catalog'))
+
+    @override_settings(STATELESS_AUTH={'ENABLED': False})
+    def test_disabled_reads_database(self):
+        """Test that the user row is read when the mode is off"""
+        with self.assertNumQueries(2):
+            response = self.client.get(ABOUT_USER_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import signal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from user.throttling import TokenBuckets, get_buckets, throttle_metrics
+
+
+REGISTER_USER_URL = reverse('user:register')
+JWT_OBTAIN_URL = reverse('user:token_obtain_pair')
+
+
+def _consume(buckets):
+    buckets.consume('test', 'key', 1, 1)
+
+
+def _die_holding_lock(buckets):
+    with buckets._shared.lock(1):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+class TokenBucketsTest(SimpleTestCase):
+    """
+    Test the shared memory token buckets.
+    """
+
+    def test_burst_then_wait(self):
+        """Test that a bucket allows its capacity and then asks to wait"""
+        buckets = TokenBuckets(slots=16)
+        for _ in range(3):
+            self.assertEqual(buckets.consume('test', 'key', 3, 0.5), 0)
+
+        wait = buckets.consume('test', 'key', 3, 0.5)
+        self.assertGreater(wait, 1)
+        self.assertLessEqual(wait, 2)
+        self.assertEqual(buckets.consume('test', 'other', 3, 0.5), 0)
+        self.assertEqual(buckets.stats(),
+                         {'test': {'allowed': 4, 'rejected': 1}})
+
+    def test_full_table_evicts_least_recently_used(self):
+        """Test that keys keep getting buckets once every slot is taken"""
+        buckets = TokenBuckets(slots=4)
+        for i in range(10):
+            self.assertEqual(buckets.consume('test', f'key{i}', 1, 0.01), 0)
+
+    def test_buckets_are_shared_with_forked_processes(self):
+        """Test that a forked process consumes from the same bucket"""
+        buckets = TokenBuckets(slots=16)
+        process = multiprocessing.get_context('fork').Process(
+            target=_consume, args=(buckets,)
+        )
+        process.start()
+        process.join()
+
+        self.assertGreater(buckets.consume('test', 'key', 1, 1), 0)
+
+    def test_lock_released_when_holder_dies(self):
+        """Test that a process killed holding the lock does not keep it"""
+        buckets = TokenBuckets(slots=16)
+        process = multiprocessing.get_context('fork').Process(
+            target=_die_holding_lock, args=(buckets,)
+        )
+        process.start()
+        process.join()
+
+        self.assertEqual(process.exitcode, -signal.SIGKILL)
+        self.assertEqual(buckets.consume('test', 'key', 1, 1), 0)
+        self.assertGreater(buckets.consume('test', 'key', 1, 1), 0)
+        self.assertEqual(buckets.stats()['test']['rejected'], 1)
+
+
+@override_settings(THROTTLING={'RATES': {
+    'token_ip': '3/min', 'token_email': '2/min', 'register_ip': '1/min',
+}})
+class ThrottledEndpointsTest(APITestCase):
+    """
+    Test the throttles in front of the token and register endpoints.
+    """
+
+    def setUp(self):
+        get_buckets().clear()
+        self.addCleanup(get_buckets().clear)
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com', password='testpass123'
+        )
+
+    def test_token_throttled_per_email(self):
+        """Test that an email is throttled whatever address it comes from"""
+        payload = {'email': 'TEST@email.com', 'password': 'wrong'}
+        for address in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post(JWT_OBTAIN_URL, payload,
+                                        REMOTE_ADDR=address)
+            self.assertEqual(response.status_code,
+                             status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(JWT_OBTAIN_URL, payload,
+                                    REMOTE_ADDR='10.0.0.3')
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertNotIn('hash', response['Server-Timing'])
+
+    def test_token_throttled_per_address(self):
+        """Test that an address is throttled across emails"""
+        for i in range(3):
+            self.client.post(JWT_OBTAIN_URL, {
+                'email': f'user{i}@email.com', 'password': 'wrong',
+            })
+
+        response = self.client.post(JWT_OBTAIN_URL, {
+            'email': 'test@email.com', 'password': 'testpass123',
+        })
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(throttle_metrics()['throttle_token_ip_rejected'], 1)
+
+    def test_forwarded_for_is_not_trusted(self):
+        """Test that X-Forwarded-For cannot give a fresh address"""
+        for i in range(4):
+            response = self.client.post(
+                JWT_OBTAIN_URL,
+                {'email': f'user{i}@email.com', 'password': 'wrong'},
+                HTTP_X_FORWARDED_FOR=f'192.0.2.{i}',
+            )
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_register_throttled(self):
+        """Test that registrations beyond the rate are rejected"""
+        payload = {'email': 'new@email.com', 'name': 'John Doe',
+                   'password': 'testpass123'}
+        response = self.client.post(REGISTER_USER_URL, payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        payload['email'] = 'other@email.com'
+        response = self.client.post(REGISTER_USER_URL, payload)
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='other@email.com').exists()
+        )
@@ -0,0 +1,80 @@
+import time
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework import status
+
+from user.tokens import VerifiedTokenCache, get_token_cache
+
+
+ABOUT_USER_URL = reverse('user:aboutme')
+JWT_VERIFY_URL = reverse('user:token_verify')
+
+
+class VerifiedTokenCacheTest(APITestCase):
+    """
+    Test the bounded cache of verified token payloads.
+    """
+
+    def test_entries_expire_with_token(self):
+        """Test that a payload is never cached past the token's exp"""
+        cache = VerifiedTokenCache(max_entries=10, ttl=300)
+        cache.set('expired', {'exp': time.time() - 1})
+        cache.set('valid', {'exp': time.time() + 60})
+
+        self.assertIsNone(cache.get('expired'))
+        self.assertIsNotNone(cache.get('valid'))
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache never grows past max_entries"""
+        cache = VerifiedTokenCache(max_entries=2, ttl=300)
+        cache.set('a', {})
+        cache.set('b', {})
+        cache.get('a')
+        cache.set('c', {})
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+
+class CachedVerificationTest(APITestCase):
+    """
+    Test that token verification and authentication share the cache.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            name='Test Johnson',
+            password='testpass876'
+        )
+        self.client = APIClient()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+        get_token_cache().clear()
+
+    def test_verify_then_authenticate_hits_cache(self):
+        """Test that a verified token is not verified again"""
+        response = self.client.post(JWT_VERIFY_URL,
+                                    {'token': str(self.access)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        response = self.client.get(ABOUT_USER_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(get_token_cache().stats()['misses'], 1)
+        self.assertEqual(get_token_cache().stats()['hits'], 1)
+
+    def test_cached_refresh_token_cannot_authenticate(self):
+        """Test that the cache does not bypass the token type check"""
+        response = self.client.post(JWT_VERIFY_URL,
+                                    {'token': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh}")
+        response = self.client.get(ABOUT_USER_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
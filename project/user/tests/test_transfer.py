@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from user.transfer import Checkpoint
+
+
+class UserTransferTest(TestCase):
+    """
+    Test the export_users and import_users management commands.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        for i in range(5):
+            get_user_model().objects.create_user(
+                email=f'user{i}@email.com', name=f'User {i}',
+                password=f'testpass{i}00',
+            )
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def export(self, name, *args):
+        call_command('export_users', self.path(name), *args,
+                     chunk_size=2, stderr=StringIO())
+
+    def reimport(self, name, *args):
+        hashes = dict(get_user_model().objects.values_list('email',
+                                                           'password'))
+        get_user_model().objects.all().delete()
+        call_command('import_users', self.path(name), *args,
+                     batch_size=2, stdout=StringIO())
+        return hashes
+
+    def test_export_ndjson(self):
+        """Test that every user is written as one JSON line with its hash"""
+        self.export('users.ndjson')
+
+        with open(self.path('users.ndjson')) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['email'] for row in rows],
+                         [f'user{i}@email.com' for i in range(5)])
+        self.assertTrue(rows[0]['password'].startswith('pbkdf2_sha256$'))
+        self.assertFalse(os.path.exists(self.path('users.ndjson.checkpoint')))
+
+    def test_round_trip_keeps_password_hashes(self):
+        """Test that imported users keep their hash and can log in"""
+        for name in ('users.ndjson', 'users.csv'):
+            self.export(name)
+            hashes = self.reimport(name)
+
+            users = get_user_model().objects.order_by('email')
+            self.assertEqual(dict(users.values_list('email', 'password')),
+                             hashes)
+            self.assertTrue(users[0].check_password('testpass000'))
+            self.assertFalse(users[0].is_staff)
+
+    def test_import_skips_existing_emails(self):
+        """Test that users already present are left untouched"""
+        self.export('users.csv')
+        call_command('import_users', self.path('users.csv'),
+                     stdout=StringIO())
+
+        self.assertEqual(get_user_model().objects.count(), 5)
+
+    def test_export_resume(self):
+        """Test that a resumed export rewrites what followed the checkpoint"""
+        self.export('users.ndjson')
+        with open(self.path('users.ndjson')) as f:
+            lines = f.readlines()
+        with open(self.path('users.ndjson'), 'w') as f:
+            f.writelines(lines[:2])
+            offset = f.tell()
+            f.write(lines[2][:10])
+        user = get_user_model().objects.get(email='user1@email.com')
+        Checkpoint(self.path('users.ndjson.checkpoint')).save(
+            id=user.id, offset=offset
+        )
+
+        self.export('users.ndjson', '--resume')
+
+        with open(self.path('users.ndjson')) as f:
+            self.assertEqual(f.readlines(), lines)
+
+    def test_import_resume(self):
+        """Test that a resumed import skips the rows already loaded"""
+        self.export('users.ndjson')
+        get_user_model().objects.all().delete()
+        Checkpoint(self.path('users.ndjson.checkpoint')).save(rows=3)
+
+        call_command('import_users', self.path('users.ndjson'), '--resume',
+                     stdout=StringIO())
+
+        self.assertEqual(
+            list(get_user_model().objects.order_by('email')
+                 .values_list('email', flat=True)),
+            ['user3@email.com', 'user4@email.com'],
+        )
@@ -0,0 +1,48 @@
+from django.contrib.auth.password_validation import \
+    get_default_password_validators
+from django.test import SimpleTestCase
+
+from designh.warmup import STEPS, parse_importtime, warm
+from user.password_validation import PasswordPolicyValidator
+
+
+class WarmupTest(SimpleTestCase):
+    """
+    Test the startup warmup and import time report.
+    """
+
+    def test_warm_runs_every_step(self):
+        """Test that warm times every step in order"""
+        timings = warm()
+
+        self.assertEqual([step for step, _ in timings],
+                         [step for step, _ in STEPS])
+        self.assertTrue(all(seconds >= 0 for _, seconds in timings))
+
+    def test_warm_loads_password_list(self):
+        """Test that the password list is loaded before the first request"""
+        validators = [
+            validator for validator in get_default_password_validators()
+            if isinstance(validator, PasswordPolicyValidator)
+        ]
+        self.assertTrue(validators)
+        for validator in validators:
+            validator._passwords = None
+
+        warm()
+
+        for validator in validators:
+            self.assertIsNotNone(validator._passwords)
+
+    def test_parse_importtime(self):
+        """Test that the -X importtime report is parsed per module"""
+        lines = [
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |   _io',
+            'import time:      1500 |       4200 | django.db',
+            'unrelated line',
+        ]
+
+        self.assertEqual(parse_importtime(lines), [
+            ('_io', 120, 120), ('django.db', 1500, 4200),
+        ])
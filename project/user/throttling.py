@@ -0,0 +1,216 @@
+import hashlib
+import struct
+import threading
+import time
+
+from rest_framework.throttling import BaseThrottle
+
+from .conf import get_setting
+from .shared_memory import LockTimeout, SharedMap
+
+
+# Key digest, tokens left and time of the last update of a bucket
+BUCKET = struct.Struct('=Qdd')
+# Scope name, allowed and rejected requests
+SCOPE_LENGTH = 32
+COUNTER = struct.Struct(f'={SCOPE_LENGTH}sQQ')
+COUNTERS = 32
+# Buckets looked at before evicting the least recently used of them
+PROBES = 8
+# Requests are let through rather than stalling every worker behind a
+# process holding the lock for longer than this
+LOCK_TIMEOUT = 0.05
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Return (requests, seconds) for a rate such as '10/min'"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBuckets:
+    """
+    Token buckets in a shared memory map.
+
+    The map and its lock are inherited by every process forked after the
+    buckets are created, see SharedMap, so all gunicorn workers of a
+    preloaded master see and update the same buckets without a round trip
+    to any server. The
+    table has a fixed number of slots; a key hashes to a short run of slots
+    and takes over the least recently used one when none is free.
+
+    Allowed and rejected requests are counted per scope in the same map.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._offset = COUNTERS * COUNTER.size
+        self._shared = SharedMap(self._offset + slots * BUCKET.size)
+        self._map = self._shared.map
+
+    def consume(self, scope, key, capacity, rate):
+        """
+        Take a token from the bucket of key, which holds up to capacity
+        tokens and refills at rate tokens per second. Return 0 when the
+        request may proceed, otherwise the seconds until a token is back.
+        """
+        digest = int.from_bytes(
+            hashlib.blake2b(f'{scope}:{key}'.encode(), digest_size=8)
+            .digest(), 'little'
+        ) or 1
+        try:
+            with self._shared.lock(LOCK_TIMEOUT):
+                return self._consume(scope, digest, capacity, rate)
+        except LockTimeout:
+            return 0.0
+
+    def _consume(self, scope, digest, capacity, rate):
+        now = time.monotonic()
+        offset, tokens, updated = self._find(digest, capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        BUCKET.pack_into(self._map, offset, digest, tokens, now)
+        self._count(scope, rejected=bool(wait))
+        return wait
+
+    def _find(self, digest, capacity, now):
+        start = digest % self.slots
+        oldest = None
+        for probe in range(PROBES):
+            offset = self._offset + (start + probe) % self.slots * BUCKET.size
+            found, tokens, updated = BUCKET.unpack_from(self._map, offset)
+            if found == digest:
+                return offset, tokens, updated
+            if found == 0:
+                return offset, capacity, now
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return oldest[0], capacity, now
+
+    def _count(self, scope, rejected):
+        name = scope.encode()[:SCOPE_LENGTH]
+        for index in range(COUNTERS):
+            offset = index * COUNTER.size
+            found, allowed, denied = COUNTER.unpack_from(self._map, offset)
+            found = found.rstrip(b'\0')
+            if found == name or not found:
+                COUNTER.pack_into(self._map, offset, name,
+                                  allowed + (not rejected), denied + rejected)
+                return
+
+    def stats(self):
+        """
+        Return the allowed and rejected requests of every scope, raise
+        LockTimeout when the buckets stay locked
+        """
+        stats = {}
+        with self._shared.lock(LOCK_TIMEOUT):
+            for index in range(COUNTERS):
+                name, allowed, rejected = COUNTER.unpack_from(
+                    self._map, index * COUNTER.size
+                )
+                name = name.rstrip(b'\0').decode()
+                if name:
+                    stats[name] = {'allowed': allowed, 'rejected': rejected}
+        return stats
+
+    def clear(self):
+        """Refill every bucket and reset the counters"""
+        with self._shared.lock(LOCK_TIMEOUT):
+            self._map[:] = bytes(len(self._map))
+
+
+def get_buckets():
+    """
+    Return the shared token buckets, creating them on first use.
+
+    UserConfig.ready creates them so a preloaded master holds them before
+    the workers fork.
+    """
+    global _buckets
+
+    with _buckets_lock:
+        if _buckets is None:
+            _buckets = TokenBuckets(get_setting('THROTTLING', 'SLOTS'))
+        return _buckets
+
+
+def throttle_metrics():
+    """Return the allowed and rejected requests of every scope as metrics"""
+    try:
+        stats = get_buckets().stats()
+    except LockTimeout:
+        return {}
+    return {
+        f'throttle_{scope}_{name}': value
+        for scope, counts in stats.items()
+        for name, value in counts.items()
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle requests with a token bucket per key.
+
+    The rate comes from the '<throttle_scope>_<key_name>' entry of
+    THROTTLING['RATES'], where throttle_scope is set on the view. A rate
+    of '10/min' allows bursts of 10 requests refilled over a minute. Views
+    without a rate and requests without a key are not throttled.
+    """
+    key_name = None
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self._wait = 0.0
+        scope = f"{getattr(view, 'throttle_scope', None)}_{self.key_name}"
+        rate = get_setting('THROTTLING', 'RATES').get(scope)
+        if rate is None:
+            return True
+
+        key = self.get_key(request)
+        if not key:
+            return True
+
+        capacity, period = parse_rate(rate)
+        self._wait = get_buckets().consume(scope, key, capacity,
+                                           capacity / period)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    """
+    Token bucket per client address.
+    """
+    key_name = 'ip'
+
+    def get_key(self, request):
+        # Only trusts the REST_FRAMEWORK['NUM_PROXIES'] last addresses of
+        # X-Forwarded-For, with 0 the peer address is used
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """
+    Token bucket per email address in the request body.
+    """
+    key_name = 'email'
+
+    def get_key(self, request):
+        email = getattr(request.data, 'get', lambda key: None)('email')
+        if isinstance(email, str):
+            return email.strip().lower()
+        return None
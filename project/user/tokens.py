@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from .conf import get_setting
+
+
+# Claim tying a refresh token to the password_epoch it was issued under
+PASSWORD_CLAIM = 'pwd'
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of the payloads of tokens whose signature has already
+    been verified, keyed by a digest of the raw token.
+
+    Entries live for at most ttl seconds and never past the token's own exp
+    claim, so an expired token is never served from the cache.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).digest()
+
+    def get(self, raw_token):
+        """Return the cached payload of a token or None"""
+        key = self._key(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, raw_token, payload):
+        """Cache the payload of a verified token"""
+        expires = time.time() + self.ttl
+        if 'exp' in payload:
+            expires = min(expires, payload['exp'])
+        if expires <= time.time():
+            return
+
+        key = self._key(raw_token)
+        with self._lock:
+            self._entries[key] = (expires, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached payload and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+def get_token_cache():
+    """Return the process wide verified token cache"""
+    global _token_cache
+
+    with _token_cache_lock:
+        if _token_cache is None:
+            _token_cache = VerifiedTokenCache(
+                max_entries=get_setting('TOKEN_CACHE', 'MAX_ENTRIES'),
+                ttl=get_setting('TOKEN_CACHE', 'TTL'),
+            )
+        return _token_cache
+
+
+def token_cache_metrics():
+    """Return the verified token cache counters as metrics"""
+    return {
+        f'token_cache_{name}': value
+        for name, value in get_token_cache().stats().items()
+    }
+
+
+def get_verified_token(token_class, raw_token):
+    """
+    Return a token_class instance for a raw token, checking its signature
+    only when the token is not in the verified token cache.
+
+    Cached tokens still go through the cheap claim checks of Token.verify,
+    which covers expiry and the token type expected by token_class. Raises
+    TokenError like the token class itself.
+    """
+    cache = get_token_cache()
+    payload = cache.get(raw_token)
+    if payload is None:
+        token = token_class(raw_token)
+        cache.set(raw_token, dict(token.payload))
+        return token
+
+    token = token_class.__new__(token_class)
+    token.token = raw_token
+    token.current_time = aware_utcnow()
+    token.payload = dict(payload)
+    token.verify()
+    return token
@@ -1,17 +1,15 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
 
-from .views import RegisterView, AboutMeView
+from .views import RegisterView, BulkRegisterView, AboutMeView, \
+    TokenObtainPairView, TokenRefreshView, TokenVerifyView, UserResolveView
 
 app_name = 'user'
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('register/bulk/', BulkRegisterView.as_view(), name='register_bulk'),
     path('aboutme/', AboutMeView.as_view(), name='aboutme'),
+    path('resolve/', UserResolveView.as_view(), name='resolve'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
@@ -1,6 +1,23 @@
 from django.contrib.auth import get_user_model
-from rest_framework import generics
-from .serializers import UserSerializer
+from django.db import DEFAULT_DB_ALIAS
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
+
+from .cache import get_cached_profiles, get_user_version, \
+    set_cached_profiles
+from .conf import get_setting
+from .permissions import CanViewUsers
+from .renderers import FastJSONRenderer
+from .serializers import TokenObtainPairSerializer, \
+    TokenRefreshSerializer, TokenVerifySerializer, UserReadSerializer, \
+    UserSerializer
+from .stateless import StatelessUser
+from .throttling import EmailThrottle, IPThrottle
 
 
 class RegisterView(generics.CreateAPIView):
@@ -9,14 +26,227 @@ class RegisterView(generics.CreateAPIView):
     """
     serializer_class = UserSerializer
     queryset = get_user_model().objects.all()
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'register'
+
+    def create(self, request, *args, **kwargs):
+        """Create the user and answer with its public fields"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+        return Response(UserReadSerializer(user).data,
+                        status=status.HTTP_201_CREATED)
 
 
-class AboutMeView(generics.RetrieveAPIView):
+class BulkRegisterView(generics.GenericAPIView):
     """
-    View user credentials for the JWT in header.
+    Register a list of users in a single request.
+
+    Every row is validated on its own and rows with errors are reported back
+    by index without preventing the valid rows from being created.
     """
     serializer_class = UserSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        """Create the valid users of the payload and report the rest"""
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError('Expected a list of users.')
+
+        max_users = get_setting('BULK_REGISTRATION', 'MAX_USERS')
+        if len(rows) > max_users:
+            raise ValidationError(
+                f'Cannot register more than {max_users} users at once.'
+            )
+
+        valid, errors = [], {}
+        for index, row in enumerate(rows):
+            serializer = self.get_serializer(data=row)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+
+        created, failed = get_user_model().objects.bulk_create_users(
+            [data for _, data in valid]
+        )
+        for position, error in failed.items():
+            errors[valid[position][0]] = error
+
+        return Response(
+            {
+                'created': UserReadSerializer(created, many=True).data,
+                'errors': [
+                    {'index': index, 'errors': error}
+                    for index, error in sorted(errors.items())
+                ],
+            },
+            status=status.HTTP_201_CREATED if created
+            else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class AboutMeView(generics.RetrieveUpdateAPIView):
+    """
+    View and update the account of the user of the JWT in header.
+
+    Updates write only the fields that changed, in a single UPDATE. Read
+    responses carry an ETag built from the user's cached version, so
+    clients polling with If-None-Match get an empty 304 while the user
+    has not changed.
+    """
+    serializer_class = UserSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve the user's credentials"""
         return self.request.user
+
+    def retrieve(self, request, *args, **kwargs):
+        """Answer with a 304 when the client's copy is still current"""
+        user = request.user
+        if isinstance(user, StatelessUser):
+            # The claims were checked against the current version on
+            # authentication and are exactly that version
+            version = user.token['ver']
+        else:
+            # The row authentication read may predate the version, read
+            # the version first and the row the body comes from after it
+            version = get_user_version(user.pk)
+        etag = f'"{user.pk}-{version}"'
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            if not isinstance(user, StatelessUser):
+                user.refresh_from_db(using=DEFAULT_DB_ALIAS)
+            response = Response(UserReadSerializer(user).data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class UserResolveView(generics.GenericAPIView):
+    """
+    Resolve many user ids to their public fields for internal services.
+
+    ?ids=1,2,3 takes up to USER_RESOLUTION['MAX_IDS'] ids and ?fields=a,b
+    picks among email and name, the id is always included. Users come from
+    the per user profile cache and the misses from a single IN query.
+    Answers for at least STREAM_MIN_IDS ids are streamed while the rows are
+    read instead of being built in memory, and list the users in no
+    particular order. Users that do not exist are listed under missing.
+
+    Callers authenticate as a service account granted the
+    user.view_customuser permission.
+    """
+    permission_classes = [CanViewUsers]
+    profile_fields = ('id', 'email', 'name')
+
+    def get_ids(self):
+        """Return the requested user ids, without duplicates"""
+        try:
+            ids = [int(pk) for pk in
+                   self.request.query_params.get('ids', '').split(',') if pk]
+        except ValueError:
+            raise ValidationError({'ids': ['Expected integer ids.']})
+        if not ids:
+            raise ValidationError({'ids': ['This field is required.']})
+
+        max_ids = get_setting('USER_RESOLUTION', 'MAX_IDS')
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > max_ids:
+            raise ValidationError(
+                {'ids': [f'Cannot resolve more than {max_ids} users.']}
+            )
+        return ids
+
+    def get_fields(self):
+        """Return the fields requested for every user"""
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return self.profile_fields
+        fields = [name for name in requested.split(',') if name]
+        unknown = set(fields) - set(self.profile_fields)
+        if unknown:
+            raise ValidationError({'fields': [
+                f"Unknown fields: {', '.join(sorted(unknown))}"
+            ]})
+        return ('id',) + tuple(name for name in fields if name != 'id')
+
+    def iter_profiles(self, ids):
+        """Yield the cached users first, then those read from the database"""
+        cached, versions = get_cached_profiles(ids)
+        yield from cached.values()
+
+        missing = [pk for pk in ids if pk not in cached]
+        if not missing:
+            return
+        timeout = get_setting('USER_RESOLUTION', 'CACHE_TIMEOUT')
+        read = []
+        # From the primary, a replica may not have the change that evicted
+        # a profile yet
+        users = get_user_model()._default_manager.using(DEFAULT_DB_ALIAS)
+        for profile in users.filter(pk__in=missing) \
+                .values(*self.profile_fields).iterator(chunk_size=500):
+            read.append(profile)
+            yield profile
+            if len(read) == 500:
+                set_cached_profiles(read, versions, timeout)
+                read = []
+        set_cached_profiles(read, versions, timeout)
+
+    def stream(self, ids, fields):
+        """Yield the JSON body of the answer in chunks"""
+        encode = FastJSONRenderer.get_encoder().encode
+        found = set()
+        yield '{"users":['
+        for profile in self.iter_profiles(ids):
+            yield (',' if found else '') \
+                + encode({name: profile[name] for name in fields})
+            found.add(profile['id'])
+        yield '],"missing":' \
+            + encode([pk for pk in ids if pk not in found]) + '}'
+
+    def get(self, request, *args, **kwargs):
+        ids = self.get_ids()
+        fields = self.get_fields()
+        if len(ids) >= get_setting('USER_RESOLUTION', 'STREAM_MIN_IDS'):
+            return StreamingHttpResponse(
+                (chunk.encode() for chunk in self.stream(ids, fields)),
+                content_type='application/json',
+            )
+
+        found = {profile['id']: profile
+                 for profile in self.iter_profiles(ids)}
+        return Response({
+            'users': [{name: found[pk][name] for name in fields}
+                      for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    """
+    Obtain a token pair, shedding bursts before any password is hashed.
+    """
+    serializer_class = TokenObtainPairSerializer
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'token'
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    """
+    Refresh a token pair, rotating the refresh token.
+    """
+    serializer_class = TokenRefreshSerializer
+
+
+class TokenVerifyView(jwt_views.TokenVerifyView):
+    """
+    Verify a JWT, reusing the result of earlier verifications.
+    """
+    serializer_class = TokenVerifySerializer